@@ -1,9 +1,18 @@
 # System level imports
-import os, io, logging, json, time, re, glob, math, tempfile
+import os, io, logging, json, time, re, glob, math, tempfile, copy
 from datetime import datetime
 from threading import Condition
-import threading, subprocess
+from collections import OrderedDict, deque
+from array import array
+import bisect
+import threading, subprocess, queue, uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+import multiprocessing
+import functools
+import hashlib
 import argparse
+import asyncio
+from urllib.parse import urlsplit, parse_qs
 
 # Flask imports
 from flask import Flask, render_template, request, jsonify, Response, send_file, abort, session, redirect, url_for
@@ -19,6 +28,12 @@ from libcamera import Transform, controls
 
 # Image handeling imports
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageOps, ExifTags
+# Edit pipeline, also run by the export worker processes
+from image_edit import apply_edits, export_edit
+
+# Export workers are spawned fresh and re-import this file as __mp_main__, they only need the
+# definitions, everything with side effects runs in the Startup section at the end of this file
+export_worker_process = __name__ == "__mp_main__"
 
 ####################
 # Initialize Flask 
@@ -29,23 +44,6 @@ app.secret_key = secrets.token_hex(16)  # Generates a random 32-character hexade
 # https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Set-Cookie#samesitesamesite-value
 app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
 
-####################
-# Initialize picamera2 
-####################
-
-# Set debug level to Warning
-Picamera2.set_logging(Picamera2.DEBUG)
-# Ask picamera2 for what cameras are connected
-global_cameras = Picamera2.global_camera_info()
-
-##### Uncomment the line below if you want to limt the number of cameras connected (change the number to index which camera you want)
-# global_cameras = [global_cameras[0]]
-
-##### Uncomment the line below simulate having no cameras connected
-# global_cameras = []
-
-print(f'\nInitialize picamera2 - Cameras Found:\n{global_cameras}\n')
-
 ####################
 # Initialize default values 
 ####################
@@ -60,18 +58,57 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 # Set the path where the camera profiles are stored
 camera_profile_folder = os.path.join(current_dir, 'static/camera_profiles')
 app.config['camera_profile_folder'] = camera_profile_folder
-# Create the folder if it does not exist
-os.makedirs(app.config['camera_profile_folder'], exist_ok=True)
 
 # Set the path where the images will be stored for the image gallery
 upload_folder = os.path.join(current_dir, 'static/gallery')
 app.config['upload_folder'] = upload_folder
-# Create the folder if it does not exist
-os.makedirs(app.config['upload_folder'], exist_ok=True)
 
 # For the image gallery set items per page
 items_per_page = 12
 
+# Gallery index changes are appended to a log, folded back into the index file after this many lines
+gallery_log_compact_lines = 500
+# Seconds between gallery rescans that catch images or sidecars rewritten in place, which leave the folder mtime alone
+gallery_rescan_interval = 10
+
+# Thumbnail sizes (longest edge in pixels) served by /thumb/<filename>, the first one is the default
+thumbnail_sizes = [320, 640]
+
+# The image editor previews edits on a proxy of this size (longest edge), full resolution is only rendered on save
+edit_preview_size = 1280
+# Number of decoded editor proxies kept in memory
+edit_proxy_cache_size = 4
+# Processes rendering full resolution edits and exports
+export_workers = 2
+
+# Seconds without any /video_feed viewer before a camera stops encoding, set to 0 to always stream
+stream_idle_timeout = 30
+
+# Longest time to wait for the first frame after (re)starting a stream
+stream_ready_timeout = 2
+
+# Seconds to collect batched control updates before sending them to the camera in one call
+control_debounce = 0.05
+
+# Longest time a request waits for a camera command before giving up, the command itself still runs
+camera_command_timeout = 60
+
+# Width of the low quality (lores) stream served by /video_feed_<n>?quality=low, set to 0 to disable
+lores_max_width = 640
+
+# Metadata fields pushed by /metadata_stream_<n> and the shortest time between two updates
+metadata_stream_fields = ("ExposureTime", "AnalogueGain", "DigitalGain", "Lux", "ColourTemperature")
+metadata_stream_interval = 0.5
+
+# Metadata history served by /metadata_history_<n>, one sample every metadata_history_interval seconds.
+# Each camera keeps (fields + 1) * 8 bytes * metadata_history_size, about 1.2MB for 6 hours
+metadata_history_fields = ("ExposureTime", "AnalogueGain", "Lux", "ColourTemperature", "FrameDuration", "SensorTemperature")
+metadata_history_interval = 1
+metadata_history_size = 21600
+# Metadata only arrives while the camera runs. With this set an idle camera only stops its encoders instead of
+# suspending, so the history and /metadata_stream_<n> keep updating without viewers (costs sensor power, no encoding)
+metadata_history_keep_running = False
+
 # Define the minimum required configuration
 minimum_last_config = {
     "cameras": []
@@ -82,6 +119,12 @@ last_config_file_path = os.path.join(current_dir, 'camera-last-config.json')
 
 with open(os.path.join(current_dir, 'camera-module-info.json'), 'r') as file:
     camera_module_info = json.load(file)
+# Lookup of camera modules by sensor model, built once at startup
+camera_modules_by_model = {module["sensor_model"]: module for module in camera_module_info["camera_modules"]}
+
+# Parse the camera controls DB once, every camera gets its own deep copy on demand
+with open(os.path.join(current_dir, 'camera_controls_db.json'), 'r') as file:
+    camera_controls_db = json.load(file)
 
 # Function to load or initialize configuration
 def load_or_initialize_config(file_path, default_config):
@@ -103,77 +146,672 @@ def load_or_initialize_config(file_path, default_config):
         config = default_config
     return config
 
-def list_profiles():
-    profiles = []
-    if not os.path.exists(camera_profile_folder):
-        os.makedirs(camera_profile_folder)
-    
-    for filename in os.listdir(camera_profile_folder):
-        if filename.endswith(".json"):
-            filepath = os.path.join(camera_profile_folder, filename)
+####################
+# Profile Store Class
+####################
+
+class ProfileStore:
+    """
+    Camera profiles and camera-last-config.json with an in-memory cache validated against
+    file mtimes. Writes go through the cache and land on disk with an atomic rename.
+    """
+    def __init__(self, profile_folder, last_config_path):
+        self.profile_folder = profile_folder
+        self.last_config_path = last_config_path
+        self.lock = threading.RLock()
+        self.profiles = {}  # filename -> (mtime_ns, profile data)
+        self.last_config = None
+        self.last_config_mtime = None
+        self.version = 0  # Bumped whenever the list of profiles or their contents change
+        os.makedirs(self.profile_folder, exist_ok=True)
+
+    def write_json(self, path, data):
+        # Write a temp file in the same folder then rename it over the target
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            # mkstemp creates the file 0600, keep the target's mode (or the usual 0644) across the rename
             try:
-                with open(filepath, "r") as f:
-                    data = json.load(f)
-                model = data.get("model", "Unknown")
-                profiles.append({"filename": filename, "model": model})
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
-    return profiles
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o644
+            os.fchmod(fd, mode)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.stat(path).st_mtime_ns
+
+    def refresh(self):
+        """Re-read only the profiles that were added or changed on disk since the last call."""
+        with self.lock:
+            changed = False
+            seen = set()
+            for filename in os.listdir(self.profile_folder):
+                if not filename.endswith(".json"):
+                    continue
+                seen.add(filename)
+                filepath = os.path.join(self.profile_folder, filename)
+                try:
+                    mtime = os.stat(filepath).st_mtime_ns
+                    cached = self.profiles.get(filename)
+                    if cached and cached[0] == mtime:
+                        continue
+                    with open(filepath, "r") as f:
+                        self.profiles[filename] = (mtime, json.load(f))
+                    changed = True
+                except Exception as e:
+                    print(f"Error loading {filename}: {e}")
+            for filename in set(self.profiles) - seen:
+                del self.profiles[filename]
+                changed = True
+            if changed:
+                self.version += 1
+
+    def list_profiles(self):
+        self.refresh()
+        with self.lock:
+            return [{"filename": filename, "model": data.get("model", "Unknown")}
+                    for filename, (mtime, data) in sorted(self.profiles.items())]
+
+    def load(self, filename):
+        """Return a copy of a profile, or None if it does not exist."""
+        if os.path.basename(filename) != filename:
+            return None
+        self.refresh()
+        with self.lock:
+            cached = self.profiles.get(filename)
+            return copy.deepcopy(cached[1]) if cached else None
+
+    def save(self, filename, data):
+        with self.lock:
+            data = copy.deepcopy(data)
+            mtime = self.write_json(os.path.join(self.profile_folder, filename), data)
+            self.profiles[filename] = (mtime, data)
+            self.version += 1
+
+    def read_last_config(self):
+        with self.lock:
+            try:
+                mtime = os.stat(self.last_config_path).st_mtime_ns
+            except FileNotFoundError:
+                return {"cameras": []}  # Create an empty structure if missing
+            if self.last_config is None or mtime != self.last_config_mtime:
+                with open(self.last_config_path, "r") as f:
+                    self.last_config = json.load(f)
+                self.last_config_mtime = mtime
+            return self.last_config
+
+    def write_last_config(self, last_config):
+        with self.lock:
+            self.last_config_mtime = self.write_json(self.last_config_path, last_config)
+            self.last_config = last_config
+
+    def set_camera_profile(self, camera_num, profile_filename):
+        """Point a camera entry in camera-last-config.json at a profile, returns False if the camera is missing."""
+        with self.lock:
+            last_config = copy.deepcopy(self.read_last_config())
+            updated = False
+            for camera in last_config["cameras"]:
+                if camera["Num"] == camera_num:
+                    camera["Has_Config"] = True
+                    camera["Config_Location"] = profile_filename
+                    updated = True
+                    break
+            self.write_last_config(last_config)
+            return updated
+
+def list_profiles():
+    return profile_store.list_profiles()
 
 def control_template():
-    with open("camera_controls_db.json", "r") as f:
-        settings = json.load(f)
-    return settings
+    # Hand out a copy so per-camera edits never touch the shared template
+    return copy.deepcopy(camera_controls_db)
 
-# Load or initialize the configuration
-camera_last_config = load_or_initialize_config(last_config_file_path, minimum_last_config)
-
-def get_camera_info(camera_model, camera_module_info):
-    return next(
-        (module for module in camera_module_info["camera_modules"] if module["sensor_model"] == camera_model),
-        next(module for module in camera_module_info["camera_modules"] if module["sensor_model"] == "Unknown")
-    )
+def get_camera_info(camera_model):
+    return camera_modules_by_model.get(camera_model, camera_modules_by_model["Unknown"])
 
 ####################
 # Streaming Class and function
 ####################
 
-class StreamingOutput(io.BufferedIOBase):
+class FrameHub(io.BufferedIOBase):
+    """
+    Holds the latest encoded frame as an immutable multipart chunk with a sequence number.
+    Every stream subscriber is handed the same bytes object, so the per-frame cost does
+    not grow with the number of viewers.
+    """
     def __init__(self):
-        self.buffer = io.BytesIO()
+        self.frame = None
+        self.chunk = None
+        self.sequence = 0
+        self.epoch_sequence = 0  # Last sequence written before the latest reconfiguration
+        self.wakeups = 0
         self.condition = Condition()
+        # Callbacks fired on every new frame, used by the async streaming server
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
 
     def write(self, buf):
-        # Clear the buffer before writing the new frame
-        self.buffer.seek(0)
-        self.buffer.truncate()
-        self.buffer.write(buf)
+        # Build the multipart chunk once per frame, shared by all subscribers
+        frame = bytes(buf)
+        chunk = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n'
         with self.condition:
+            self.frame = frame
+            self.chunk = chunk
+            self.sequence += 1
             self.condition.notify_all()
+        for callback in self.listeners:
+            callback()
+        return len(frame)
 
     def read_frame(self):
-        self.buffer.seek(0)
-        return self.buffer.read()
+        with self.condition:
+            return self.frame
+
+    def mark_epoch(self):
+        # Frames up to this sequence belong to the previous configuration
+        with self.condition:
+            self.epoch_sequence = self.sequence
+
+    def wake(self):
+        """Wake every waiting subscriber without a new frame so it can re-check the camera state."""
+        with self.condition:
+            self.wakeups += 1
+            self.condition.notify_all()
+        for callback in self.listeners:
+            callback()
+
+    def wait_for_frame(self, last_sequence, timeout=None):
+        """Block until a frame newer than last_sequence is available, returns (sequence, chunk)."""
+        with self.condition:
+            wakeups = self.wakeups
+            self.condition.wait_for(lambda: self.sequence != last_sequence or self.wakeups != wakeups, timeout)
+            return self.sequence, self.chunk
+
+    def wait_for_first_frame(self, last_sequence, timeout):
+        """Wait for the pipeline to deliver a frame after a (re)start, returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.sequence != last_sequence, timeout)
+
+class MetadataHub:
+    """
+    Latest frame metadata of one camera, fed from the picamera2 post_callback so readers never
+    wait on capture_metadata(). A new update is published at most every metadata_stream_interval
+    and only when one of the metadata_stream_fields changed. No frames arrive while the camera is
+    suspended without viewers, so updates pause unless metadata_history_keep_running is set.
+    """
+    def __init__(self):
+        self.metadata = {}
+        self.updated = 0  # time.monotonic() of the last frame seen
+        self.values = {}  # Last published metadata_stream_fields values
+        self.sequence = 0
+        self.last_published = 0
+        self.condition = Condition()
+
+    def round_value(self, value):
+        # Drop float noise so tiny changes don't count as an update
+        return round(value, 2) if isinstance(value, float) else value
+
+    def pick_values(self, metadata):
+        return {key: self.round_value(metadata[key]) for key in metadata_stream_fields if key in metadata}
+
+    def update(self, metadata):
+        # Called once per frame on the camera thread, keep it cheap
+        now = time.monotonic()
+        self.metadata = metadata
+        self.updated = now
+        if now - self.last_published < metadata_stream_interval:
+            return
+        values = self.pick_values(metadata)
+        if values == self.values:
+            return
+        with self.condition:
+            self.values = values
+            self.sequence += 1
+            self.last_published = now
+            self.condition.notify_all()
+
+    def wait_for_update(self, last_sequence, timeout=None):
+        """Block until values newer than last_sequence are published, returns (sequence, values)."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence != last_sequence, timeout)
+            return self.sequence, self.values
+
+class MetadataHistory:
+    """
+    Fixed-size ring buffer of numeric frame metadata, one array('d') per field plus one for the
+    timestamps. Missing values are stored as NaN, the oldest sample is overwritten once full.
+    """
+    def __init__(self, fields=metadata_history_fields, size=metadata_history_size, interval=metadata_history_interval):
+        self.fields = fields
+        self.size = size
+        self.interval = interval
+        self.times = array('d', [0.0]) * size
+        self.series = {field: array('d', [math.nan]) * size for field in fields}
+        self.count = 0  # Samples written since start, the next one goes to count % size
+        self.last_sample = 0
+        self.lock = threading.Lock()
+
+    def add(self, metadata, timestamp=None):
+        # Called once per frame, only every interval seconds is kept
+        timestamp = time.time() if timestamp is None else timestamp
+        if timestamp - self.last_sample < self.interval:
+            return
+        with self.lock:
+            index = self.count % self.size
+            self.times[index] = timestamp
+            for field in self.fields:
+                value = metadata.get(field)
+                self.series[field][index] = float(value) if isinstance(value, (int, float)) else math.nan
+            self.count += 1
+            self.last_sample = timestamp
+
+    def ordered(self, values):
+        # Oldest to newest copy of one ring array, called with the lock held
+        if self.count < self.size:
+            return values[:self.count]
+        first = self.count % self.size
+        return values[first:] + values[:first]
+
+    def query(self, start, end, fields=None, max_points=500):
+        """
+        Samples between start and end (unix time) averaged into at most max_points buckets.
+        Returns {"time": [...], <field>: [...], "suspended": [[from, to], ...]} with None where
+        a bucket had no value. "suspended" lists the periods without frames, usually because
+        the camera was suspended without viewers, to is None while that is still the case.
+        """
+        fields = [field for field in (fields or self.fields) if field in self.series]
+        with self.lock:
+            times = self.ordered(self.times)
+            series = {field: self.ordered(self.series[field]) for field in fields}
+        low = bisect.bisect_left(times, start)
+        high = bisect.bisect_right(times, end)
+        step = max(1, math.ceil((high - low) / max(1, max_points)))
+        result = {"time": []}
+        result.update({field: [] for field in fields})
+        result["suspended"] = self.find_gaps(times, low, high, end)
+        for bucket in range(low, high, step):
+            bucket_end = min(bucket + step, high)
+            result["time"].append(round(sum(times[bucket:bucket_end]) / (bucket_end - bucket), 3))
+            for field in fields:
+                values = [value for value in series[field][bucket:bucket_end] if not math.isnan(value)]
+                result[field].append(sum(values) / len(values) if values else None)
+        return result
+
+    def find_gaps(self, times, low, high, end):
+        # A gap is more than a few sample intervals without a frame, including the samples just around the window
+        threshold = self.interval * 3
+        gaps = []
+        for index in range(max(low, 1), min(high + 1, len(times))):
+            if times[index] - times[index - 1] > threshold:
+                gaps.append([times[index - 1], times[index]])
+        last_sample = times[-1] if len(times) else None
+        if last_sample is None or min(end, time.time()) - last_sample > threshold:
+            gaps.append([last_sample, None])  # No frames since the last sample, or none at all
+        return gaps
+
+class AsyncStreamServer:
+    """
+    Serves the /video_feed_<n> MJPEG endpoints from a single asyncio event loop running in
+    its own thread, so each viewer costs a coroutine instead of a Flask worker thread.
+    The Flask app keeps serving every other route and redirects feed requests here.
+    """
+    def __init__(self, cameras, host='0.0.0.0', port=8081):
+        self.cameras = cameras
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.frame_events = {}  # id(FrameHub) -> asyncio.Event replaced on every frame
+
+    def start(self):
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        print(f"[INFO] Async streaming server running on {self.host}:{self.port}")
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        server = self.loop.run_until_complete(asyncio.start_server(self.handle_client, self.host, self.port))
+        self.loop.run_until_complete(server.serve_forever())
+
+    def register_hub(self, hub):
+        # Bridge frames written by the encoder thread into the event loop
+        hub_key = id(hub)
+        if hub_key not in self.frame_events:
+            self.frame_events[hub_key] = asyncio.Event()
+            hub.add_listener(lambda: self.loop.call_soon_threadsafe(self.publish, hub_key))
+        return hub_key
+
+    def publish(self, hub_key):
+        # Wake every waiting client then arm a fresh event for the next frame
+        self.frame_events[hub_key].set()
+        self.frame_events[hub_key] = asyncio.Event()
+
+    async def handle_client(self, reader, writer):
+        try:
+            request_head = await reader.readuntil(b'\r\n\r\n')
+            request_line = request_head.split(b'\r\n', 1)[0].decode('latin-1')
+            method, target, _ = request_line.split(' ', 2)
+            url = urlsplit(target)
+            match = re.fullmatch(r'/video_feed_(\d+)', url.path)
+            camera = self.cameras.get(int(match.group(1))) if match else None
+            if method != 'GET' or not camera:
+                writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                await writer.drain()
+                return
+            query = parse_qs(url.query)
+            try:
+                max_fps = float(query.get('max_fps', [0])[0])
+            except ValueError:
+                max_fps = 0
+            quality = query.get('quality', ['high'])[0]
+            writer.write(b'HTTP/1.1 200 OK\r\n'
+                b'Content-Type: multipart/x-mixed-replace; boundary=frame\r\n'
+                b'Cache-Control: no-store, no-cache, must-revalidate, max-age=0\r\n'
+                b'Connection: close\r\n\r\n')
+            # Encoder start/stop may block, keep it off the event loop
+            await self.loop.run_in_executor(None, camera.acquire_stream)
+            try:
+                await self.stream_camera(camera, writer, max_fps, quality)
+            finally:
+                camera.release_stream()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream_camera(self, camera, writer, max_fps, quality):
+        min_interval = 1.0 / max_fps if max_fps > 0 else 0
+        last_sequence = 0
+        config_epoch = camera.config_epoch
+        last_sent = 0
+        while True:
+            hub = camera.get_stream_hub(quality)
+            if camera.capturing_still or hub is None or not camera.streaming:
+                writer.write(camera.placeholder_chunk)
+                await writer.drain()
+                await asyncio.sleep(0.1)
+                continue
+            if config_epoch != camera.config_epoch:
+                config_epoch = camera.config_epoch
+                last_sequence = max(last_sequence, hub.epoch_sequence)
+            hub_key = self.register_hub(hub)
+            if hub.sequence == last_sequence:
+                try:
+                    await asyncio.wait_for(self.frame_events[hub_key].wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                if hub.sequence == last_sequence:
+                    continue  # Woken without a new frame, re-check the camera state
+            # Always send the newest frame, anything produced while draining is skipped
+            last_sequence, chunk = hub.sequence, hub.chunk
+            if chunk is None or last_sequence <= hub.epoch_sequence:
+                continue
+            writer.write(chunk)
+            await writer.drain()
+            # Throttle like stream_frames, only sleeping whatever is left of the interval
+            if min_interval:
+                elapsed = time.monotonic() - last_sent
+                if elapsed < min_interval:
+                    await asyncio.sleep(min_interval - elapsed)
+                last_sent = time.monotonic()
+
+####################
+# Camera Command Executor Class
+####################
+
+class CameraBusyError(Exception):
+    """The camera can't take this command right now, answered with HTTP 409."""
+
+class CameraCommandExecutor:
+    """
+    Runs every reconfiguration and capture for one camera on a single thread so two requests
+    can never stop and start picamera2 at the same time. A queued command with a merge key
+    is replaced by a newer command with the same key instead of running twice.
+    """
+    def __init__(self, name):
+        self.commands = deque()
+        self.pending = {}  # merge key -> queued command
+        self.condition = Condition()
+        self.thread = threading.Thread(target=self.worker, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args, merge_key=None, **kwargs):
+        with self.condition:
+            if merge_key is not None and merge_key in self.pending:
+                # Superseded before it ran, only the newest arguments are applied
+                command = self.pending[merge_key]
+                command.update(func=func, args=args, kwargs=kwargs)
+                print(f"Merged queued camera command: {merge_key}")
+                return command["future"]
+            command = {"func": func, "args": args, "kwargs": kwargs, "merge_key": merge_key, "future": Future()}
+            self.commands.append(command)
+            if merge_key is not None:
+                self.pending[merge_key] = command
+            self.condition.notify()
+            return command["future"]
+
+    def run(self, func, *args, merge_key=None, timeout=camera_command_timeout, **kwargs):
+        """Run a command and wait for its result, commands issued by a running command run inline."""
+        if threading.current_thread() is self.thread:
+            return func(*args, **kwargs)
+        future = self.submit(func, *args, merge_key=merge_key, **kwargs)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            raise CameraBusyError(f"Timed out after {timeout}s waiting for camera command {func.__name__}")
+
+    def worker(self):
+        while True:
+            with self.condition:
+                while not self.commands:
+                    self.condition.wait()
+                command = self.commands.popleft()
+                if command["merge_key"] is not None:
+                    self.pending.pop(command["merge_key"], None)
+            future = command["future"]
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(command["func"](*command["args"], **command["kwargs"]))
+            except Exception as e:
+                future.set_exception(e)
+
+def camera_command(merge_key=None):
+    """Decorator that runs a CameraObject method on the camera's command executor."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            return self.commands.run(method, self, *args, merge_key=merge_key, **kwargs)
+        return wrapper
+    return decorator
+
+####################
+# Capture Queue Class
+####################
+
+# Every capture job by id, shared by all cameras so /capture_status only needs the job id
+capture_jobs = OrderedDict()
+capture_jobs_lock = threading.Lock()
+max_capture_jobs = 100
+max_burst_count = 100
+
+class CaptureQueue:
+    """
+    Runs still captures for one camera on a background thread, one job at a time, so the
+    HTTP request only queues the job and returns its id. Jobs are single shots, bursts
+    or time-lapses. Single shots are refused while a burst or time-lapse is queued or
+    running, they would otherwise wait behind it for as long as it lasts.
+    """
+    session_modes = ("burst", "timelapse")
+
+    def __init__(self, camera):
+        self.camera = camera
+        self.queue = queue.Queue()
+        self.job_events = {}  # job id -> threading.Event set once the job finishes
+        self.cancel_events = {}  # job id -> threading.Event set to stop a burst or time-lapse early
+        self.session_jobs = 0  # Bursts and time-lapses queued or running
+        self.session_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.worker, daemon=True)
+        self.thread.start()
+
+    def submit(self, image_name, on_image=None, mode="single", options=None):
+        with self.session_lock:
+            if mode in self.session_modes:
+                self.session_jobs += 1
+            elif self.session_jobs:
+                raise CameraBusyError(f"Camera {self.camera.camera_info['Num']} is busy with a burst or time-lapse capture")
+        job = {
+            "id": uuid.uuid4().hex,
+            "camera_num": self.camera.camera_info['Num'],
+            "image": image_name,
+            "mode": mode,
+            "options": options or {},
+            "status": "queued",
+            "message": "Waiting for camera",
+            "image_path": None,
+            "capture_method": None,
+            "images": [],
+            "queued_at": time.time(),
+            "finished_at": None
+        }
+        self.job_events[job["id"]] = threading.Event()
+        self.cancel_events[job["id"]] = threading.Event()
+        with capture_jobs_lock:
+            capture_jobs[job["id"]] = job
+            # Keep the job history bounded
+            while len(capture_jobs) > max_capture_jobs:
+                capture_jobs.popitem(last=False)
+        self.queue.put((job, on_image))
+        return job
+
+    def wait(self, job_id, timeout=camera_command_timeout):
+        """Block until a job has finished, used by routes that still need the result inline."""
+        event = self.job_events.get(job_id)
+        if event and not event.wait(timeout):
+            self.cancel(job_id)  # Drop it if it never started
+            raise CameraBusyError(f"Timed out after {timeout}s waiting for capture job {job_id}")
+        return capture_jobs.get(job_id)
+
+    def cancel(self, job_id):
+        event = self.cancel_events.get(job_id)
+        if event:
+            event.set()
+        return event is not None
+
+    def worker(self):
+        while True:
+            job, on_image = self.queue.get()
+            cancel = self.cancel_events.get(job["id"])
+            job["status"] = "capturing"
+            job["message"] = "Capturing image"
+
+            def image_saved(image_path, job=job):
+                job["images"].append(image_path)
+                job["image_path"] = image_path
+                if on_image:
+                    on_image(image_path)
+
+            try:
+                if cancel.is_set():
+                    job["status"] = "cancelled"
+                    job["message"] = "Capture cancelled"
+                    continue
+                if job["mode"] in self.session_modes:
+                    job["capture_method"] = "still_session"
+                if job["mode"] == "burst":
+                    self.camera.capture_burst(job["image"], job["options"]["count"], on_image=image_saved, cancel=cancel)
+                elif job["mode"] == "timelapse":
+                    options = job["options"]
+                    self.camera.capture_timelapse(job["image"], options["interval"], count=options.get("count"),
+                                                  end_time=options.get("end_time"), on_image=image_saved, cancel=cancel)
+                else:
+                    image_path = self.camera.take_still(job["camera_num"], job["image"])
+                    job["capture_method"] = self.camera.last_capture_method
+                    if image_path:
+                        image_saved(image_path)
+                if job["images"]:
+                    job["status"] = "done"
+                    job["message"] = f"{len(job['images'])} image(s) captured successfully"
+                else:
+                    job["status"] = "failed"
+                    job["message"] = "Failed to capture image"
+            except Exception as e:
+                logging.error(f"🔥 Error in capture job {job['id']}: {e}")
+                job["status"] = "failed"
+                job["message"] = str(e)
+            finally:
+                job["finished_at"] = time.time()
+                if job["mode"] in self.session_modes:
+                    with self.session_lock:
+                        self.session_jobs -= 1
+                self.cancel_events.pop(job["id"], None)
+                event = self.job_events.pop(job["id"], None)
+                if event:
+                    event.set()
+                self.queue.task_done()
 
 ####################
 # CameraObject that will store the itteration of 1 or more cameras
 ####################
 
 class CameraObject:
+    # Settings that reconfigure the camera rather than being passed to set_controls
+    special_settings = ("sensor_mode", "hflip", "vflip", "StillCaptureResolution", "LiveFeedResolution", "saveRAW")
+
     def __init__(self, camera):
         self.camera_init = True
         self.camera_info = camera
+        # Capture state first, init_configure_camera and set_sensor_mode already check it
+        self.capturing_still = False
+        self.still_session = False  # Set while a burst or time-lapse holds the still configuration
+        # Serializes every reconfiguration and capture on this camera
+        self.commands = CameraCommandExecutor(f"camera-{camera['Num']}-commands")
         # Generate default Camera profile
         self.camera_profile = self.generate_camera_profile()
         # Init camera to picamera2 using the camera number
-        self.picam2 = Picamera2(camera['Num'])
+        with picamera2_open_lock:
+            self.picam2 = Picamera2(camera['Num'])
+        # Metadata of every completed frame, served to /metadata_stream_<n> without extra captures
+        self.metadata_hub = MetadataHub()
+        self.metadata_history = MetadataHistory()
+        self.picam2.post_callback = self.on_frame_metadata
         # Get Camera specs
         self.camera_module_spec = self.get_camera_module_spec()
         # Fetch Avaialble Sensor modes and generate available resolutions
         self.sensor_modes = self.picam2.sensor_modes
         self.camera_resolutions = self.generate_camera_resolutions()
-        # Ready buffer for feed
+        # Control updates waiting to be sent to picamera2 in one set_controls call
+        self.pending_controls = {}
+        self.pending_controls_lock = threading.Lock()
+        self.pending_controls_timer = None
+        # Ready buffers for the main and lores feeds
         self.output = None
+        self.lores_output = None
+        # Reference counted streaming, the encoder stops after stream_idle_timeout without viewers
+        self.streaming = False
+        self.stream_subscribers = 0
+        self.stream_override = None  # Set by /toggle_video_feed, None means automatic
+        self.stream_lock = threading.RLock()
+        self.idle_timer = None
+        self.metadata = {}
+        # Measured readiness latencies in seconds, reported by /camera_status
+        self.last_stream_start_latency = None
+        self.last_reconfigure_latency = None
+        # Bumped on every video reconfiguration so stream clients can drop stale frames
+        self.config_epoch = 0
+        # Signature of the video configuration the camera is running, see video_config_signature
+        self.active_video_signature = None
+        self.last_change_kind = None  # "controls", "still_config" or "restart"
+        # Cached camera page context, see get_page_context
+        self.page_context = None
+        self.page_context_key = None
+        self.page_context_version = 0
         # Initialize configs as empty dictionaries for the still and video configs
         self.init_configure_camera()
         # Compare camera controls DB flushing out settings not avaialbe from picamera2
@@ -183,13 +821,18 @@ class CameraObject:
         # Load saved camaera profile if one exists
         self.load_saved_camera_profile()
         self.camera_init = False
-        # Set capture flag and set placeholder image
-        self.capturing_still = False
+        # Set placeholder image
+        self.last_capture_method = None  # "feed" or "mode_switch", reported with capture jobs
         self.placeholder_frame = self.generate_placeholder_frame()  # Create placeholder
+        self.placeholder_chunk = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + self.placeholder_frame + b'\r\n'
         
         # Start Stream and sync metadata
         self.start_streaming()
         self.update_camera_from_metadata()
+        # Still captures run off the request thread, burst and time-lapse shots are encoded in a pool
+        self.encode_executor = ThreadPoolExecutor(max_workers=2)
+        self.encode_slots = threading.BoundedSemaphore(4)  # Caps full resolution buffers waiting to be encoded
+        self.capture_queue = CaptureQueue(self)
 
         # Final debug statements
         print(f"Available Camera Controls: {self.picam2.camera_controls}")
@@ -207,64 +850,136 @@ class CameraObject:
         self.still_config = self.picam2.create_still_configuration()
         self.video_config = self.picam2.create_video_configuration()
 
+    @camera_command(merge_key="camera_config")
     def update_camera_config(self):
-        if not self.camera_init:
-            self.picam2.stop()
+        """
+        Apply the current still and video configs, restarting the camera only when the video
+        config differs from the running one. still_config is applied by take_still when a
+        capture needs it, so a still-only change leaves the live view up.
+        Returns "restart" or "still_config".
+        """
+        self.check_reconfigure_allowed()
         self.set_orientation()
-        self.set_still_config()
-        self.set_video_config()
-        if not self.camera_init:
-            self.picam2.start()
-
+        if self.camera_init or self.video_config_signature(self.video_config) != self.active_video_signature:
+            self.configure_video_config()
+            self.last_change_kind = "restart"
+        else:
+            self.last_change_kind = "still_config"
+        print(f"Camera {self.camera_info['Num']} config change: {self.last_change_kind}")
+        return self.last_change_kind
+
+    def video_config_signature(self, config):
+        """The parts of a video config that need a stop/configure/start to change."""
+        main = config.get("main") or {}
+        lores = config.get("lores") or {}
+        sensor = config.get("sensor") or {}
+        transform = config.get("transform")
+        size = lambda value: tuple(value) if value else None
+        return (
+            size(main.get("size")), main.get("format"),
+            size(lores.get("size")),
+            size(sensor.get("output_size")), sensor.get("bit_depth"),
+            bool(getattr(transform, "hflip", False)), bool(getattr(transform, "vflip", False))
+        )
+
+    @camera_command()
     def configure_camera(self):
+        self.check_reconfigure_allowed()
+        started = time.monotonic()
         if not self.camera_init:
-            self.capturing_still = True
+            self.pause_stream_clients()
             self.stop_streaming()
             self.picam2.stop()
-            time.sleep(0.1)
         self.set_still_config()
         self.set_video_config()
         if not self.camera_init:
-            time.sleep(0.1)
+            self.signal_config_change()
             self.picam2.start()
             self.start_streaming()
             self.capturing_still = False
+            self.record_reconfigure_latency(started)
+
+    def check_reconfigure_allowed(self):
+        # A burst or time-lapse runs shot by shot, reconfiguring in between would break the still session
+        if self.still_session:
+            raise CameraBusyError(f"Camera {self.camera_info['Num']} is busy with a burst or time-lapse capture")
+
+    def signal_config_change(self):
+        """Push a new configuration epoch to stream subscribers, called while the camera is stopped."""
+        for hub in (self.output, self.lores_output):
+            if hub is not None:
+                hub.mark_epoch()
+        self.config_epoch += 1
+        self.invalidate_page_context()  # The active sensor mode may have changed
+
+    def invalidate_page_context(self):
+        self.page_context_version += 1
+
+    def get_page_context(self):
+        """Camera page values that need disk or camera queries, rebuilt only when a mode, profile or capture changes."""
+        key = (self.page_context_version, image_gallery_manager.version, profile_store.version)
+        if self.page_context_key != key:
+            self.page_context = {
+                "active_mode_index": self.get_sensor_mode(),
+                "last_image": image_gallery_manager.find_last_image_taken(),
+                "profiles": list_profiles()
+            }
+            self.page_context_key = key
+        return self.page_context
 
     def set_still_config(self):
         self.picam2.configure(self.still_config)
+        self.active_video_signature = None
 
     def set_video_config(self):
         self.picam2.configure(self.video_config)
+        self.active_video_signature = self.video_config_signature(self.video_config)
 
+    @camera_command()
     def configure_video_config(self):
+        self.check_reconfigure_allowed()
+        started = time.monotonic()
         if not self.camera_init:
-            self.capturing_still = True
+            self.pause_stream_clients()
             self.stop_streaming()
-            time.sleep(0.1)
-            self.picam2.stop()
             self.picam2.stop()
-            time.sleep(0.1)
         self.set_orientation()
-        self.picam2.configure(self.video_config)
+        self.set_video_config()
         if not self.camera_init:    
-            time.sleep(0.1)
+            self.signal_config_change()
             self.picam2.start()
             self.start_streaming()
             self.capturing_still = False
+            self.record_reconfigure_latency(started)
     
+    @camera_command()
     def configure_still_config(self):
+        self.check_reconfigure_allowed()
+        started = time.monotonic()
         if not self.camera_init:
-            self.capturing_still = True
+            self.pause_stream_clients()
             self.stop_streaming()
             self.picam2.stop()
-            time.sleep(0.1)
         self.set_orientation()
-        self.picam2.configure(self.still_config)
+        self.set_still_config()
         if not self.camera_init:
-            time.sleep(0.1)
+            self.signal_config_change()
             self.picam2.start()
             self.start_streaming()
             self.capturing_still = False
+            self.record_reconfigure_latency(started)
+
+    def pause_stream_clients(self):
+        """Switch viewers to the placeholder straight away instead of waiting for their next frame."""
+        self.capturing_still = True
+        for hub in (self.output, self.lores_output):
+            if hub is not None:
+                hub.wake()
+
+    def record_reconfigure_latency(self, started):
+        # Time from the start of a reconfiguration until the first frame of the new configuration
+        self.last_reconfigure_latency = time.monotonic() - started
+        print(f"[INFO] Camera {self.camera_info['Num']} reconfigured in {self.last_reconfigure_latency * 1000:.0f} ms")
         
 
     def load_saved_camera_profile(self):
@@ -272,15 +987,15 @@ class CameraObject:
         if self.camera_info.get("Has_Config") and self.camera_info.get("Config_Location"):
             self.load_camera_profile(self.camera_info["Config_Location"])
 
+    @camera_command(merge_key="load_profile")
     def load_camera_profile(self, profile_filename):
         """Load and apply a camera profile from a given filename."""
-        profile_path = os.path.join(camera_profile_folder, profile_filename)
-        if not os.path.exists(profile_path):
-            print(f"Profile file not found: {profile_path}")
+        self.check_reconfigure_allowed()
+        profile_data = profile_store.load(profile_filename)
+        if profile_data is None:
+            print(f"Profile file not found: {os.path.join(camera_profile_folder, profile_filename)}")
             return False
         try:
-            with open(profile_path, "r") as f:
-                profile_data = json.load(f)
             # ✅ Load the profile before applying any settings
             self.camera_profile = profile_data
             # ✅ Apply settings after loading the profile
@@ -291,26 +1006,12 @@ class CameraObject:
             self.update_settings('saveRAW', self.camera_profile['saveRAW'])
             self.apply_profile_controls()
             self.sync_live_controls()  # Ensure UI updates with the latest settings
+            self.invalidate_page_context()
             # ✅ Update camera-last-config.json
             try:
-                if os.path.exists(last_config_file_path):
-                    with open(last_config_file_path, "r") as f:
-                        last_config = json.load(f)
-                else:
-                    last_config = {"cameras": []}
-                # Find the matching camera entry
                 camera_num = self.camera_info['Num']
-                updated = False
-                for camera in last_config["cameras"]:
-                    if camera["Num"] == camera_num:
-                        camera["Has_Config"] = True
-                        camera["Config_Location"] = profile_filename
-                        updated = True
-                        break
-                if not updated:
+                if not profile_store.set_camera_profile(camera_num, profile_filename):
                     print(f"Camera {camera_num} not found in camera-last-config.json.")
-                with open(last_config_file_path, "w") as f:
-                    json.dump(last_config, f, indent=4)
                 print(f"Loaded profile '{profile_filename}' and updated camera-last-config.json.")
             except Exception as e:
                 print(f"Error updating camera-last-config.json: {e}")
@@ -340,10 +1041,10 @@ class CameraObject:
         return self.camera_profile
     
     def initialize_controls_template(self, picamera2_controls):
-        with open("camera_controls_db.json", "r") as f:
-            camera_json = json.load(f)
+        camera_json = control_template()
         if "sections" not in camera_json:
             print("Error: 'sections' key not found in camera_json!")
+            self.build_control_index(camera_json)
             return camera_json  # Return unchanged if it's not structured as expected
         # Initialize empty controls in camera_profile
         self.camera_profile["controls"] = {}
@@ -410,29 +1111,40 @@ class CameraObject:
                             print(f"Skipping or Disabling Child Setting {child_id}: Not found or no source specified")
             section["enabled"] = section_enabled
         print(f"Initialized camera_profile controls: {self.camera_profile}")
+        self.build_control_index(camera_json)
         return camera_json
 
+    def build_control_index(self, controls_template):
+        """Flatten the sections/settings/childsettings tree into an id -> setting node dict."""
+        self.control_index = {}
+        for section in controls_template.get("sections", []):
+            for setting in section.get("settings", []):
+                if isinstance(setting, dict) and "id" in setting:
+                    self.control_index[setting["id"]] = setting
+                    for child in setting.get("childsettings", []):
+                        self.control_index[child["id"]] = child
+        # Controls that can be refreshed from picamera2 metadata
+        self.enabled_control_ids = [setting_id for setting_id, setting in self.control_index.items()
+                                    if setting.get("enabled", False) and setting.get("source") == "controls"]
+
     def update_settings(self, setting_id, setting_value):
+        if setting_id in self.special_settings:
+            self.check_reconfigure_allowed()  # Checked before the profile or still_config is touched
         # Handle sensor mode separately
         if setting_id == "sensor_mode":
-            def sensor_mode_task():
-                try:
-                    self.set_sensor_mode(setting_value)
-                    self.camera_profile['sensor_mode'] = setting_value
-                    print(f"Sensor mode {setting_value} applied")
-                except ValueError as e:
-                    print(f"⚠️ Error: {e}")
-
-            # Start a thread and block until it completes
-            thread = threading.Thread(target=sensor_mode_task)
-            thread.start()
-            thread.join()
+            # Runs on the camera command executor, blocks until applied
+            try:
+                self.set_sensor_mode(setting_value)
+                self.camera_profile['sensor_mode'] = setting_value
+                print(f"Sensor mode {setting_value} applied")
+            except ValueError as e:
+                print(f"⚠️ Error: {e}")
         # Handle hflip and vflip separately
         elif setting_id in ["hflip", "vflip"]:
             try:
                 self.camera_profile[setting_id] = bool(int(setting_value))
                 self.update_camera_config()
-                print(f"Applied transform: {setting_id} -> {setting_value} (Camera restarted)")
+                print(f"Applied transform: {setting_id} -> {setting_value} ({self.last_change_kind})")
             except ValueError as e:
                 print(f"⚠️ Error: {e}")
         elif setting_id in ["StillCaptureResolution", "LiveFeedResolution"]:
@@ -446,65 +1158,127 @@ class CameraObject:
                 if setting_id == 'LiveFeedResolution':
                     self.set_live_feed_resolution(setting_value)
 
-                print(f"Applied transform: {setting_id} -> {setting_value} (Camera restarted)")
+                print(f"Applied transform: {setting_id} -> {setting_value} ({self.last_change_kind})")
             except ValueError as e:
                 print(f"⚠️ Error: {e}")
         elif setting_id == "saveRAW":
             try:
                 self.camera_profile[setting_id] = setting_value
+                self.last_change_kind = "still_config"  # Only read when saving a still
                 print(f"Applied transform: {setting_id} -> {setting_value}")
             except ValueError as e:
                 print(f"⚠️ Error: {e}")
         else:
             # Convert setting_value to correct type
-            if "." in str(setting_value):
-                setting_value = float(setting_value)
-            else:
-                setting_value = int(setting_value)
+            setting_value = self.convert_control_value(setting_value)
             # Apply the setting
             self.picam2.set_controls({setting_id: setting_value})
             # Store in camera_profile["controls"]
             self.camera_profile.setdefault("controls", {})[setting_id] = setting_value
+            self.last_change_kind = "controls"
         # Update live settings
-        updated = False
-        for section in self.live_controls.get("sections", []):
-            for setting in section.get("settings", []):
-                if setting["id"] == setting_id:
-                    setting["value"] = setting_value  # Update main setting
-                    updated = True
-                    break
-                # Check child settings
-                for child in setting.get("childsettings", []):
-                    if child["id"] == setting_id:
-                        child["value"] = setting_value  # Update child setting
-                        updated = True
-                        break
-            if updated:
-                break  # Exit loop once found
-        if not updated:
-            print(f"⚠️ Warning: Setting {setting_id} not found in live_controls!")
+        self.set_live_control_value(setting_id, setting_value)
         return setting_value  # Returning for confirmation
 
+    def convert_control_value(self, setting_value):
+        if "." in str(setting_value):
+            return float(setting_value)
+        return int(setting_value)
+
+    def update_settings_batch(self, settings):
+        """
+        Apply several settings at once. Plain controls are queued and flushed to picamera2
+        in a single set_controls call after control_debounce seconds, a newer value for the
+        same control replaces the queued one. Raises ValueError before anything is applied
+        if a control is unknown or a value can't be used.
+        """
+        controls = {setting_id: self.validate_control_value(setting_id, setting_value)
+                    for setting_id, setting_value in settings.items() if setting_id not in self.special_settings}
+        applied = {}
+        for setting_id, setting_value in settings.items():
+            if setting_id in self.special_settings:
+                applied[setting_id] = self.update_settings(setting_id, setting_value)
+        profile_controls = self.camera_profile.setdefault("controls", {})
+        for setting_id, setting_value in controls.items():
+            previous_value = profile_controls.get(setting_id)
+            profile_controls[setting_id] = setting_value
+            self.set_live_control_value(setting_id, setting_value)
+            applied[setting_id] = setting_value
+            with self.pending_controls_lock:
+                # Keep the value from before the first queued change, restored if the camera rejects it
+                if setting_id in self.pending_controls:
+                    previous_value = self.pending_controls[setting_id][1]
+                self.pending_controls[setting_id] = (setting_value, previous_value)
+                if self.pending_controls_timer is None:
+                    self.pending_controls_timer = threading.Timer(control_debounce, self.flush_pending_controls)
+                    self.pending_controls_timer.daemon = True
+                    self.pending_controls_timer.start()
+        return applied
+
+    def validate_control_value(self, setting_id, setting_value):
+        """Convert a control value for set_controls, ValueError if the camera has no such control or it is out of range."""
+        if setting_id not in self.picam2.camera_controls:
+            raise ValueError(f"Unknown control: {setting_id}")
+        try:
+            setting_value = self.convert_control_value(setting_value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {setting_id}: {setting_value!r}")
+        minimum, maximum, _ = self.picam2.camera_controls[setting_id]
+        if isinstance(minimum, (int, float)) and isinstance(maximum, (int, float)) and not minimum <= setting_value <= maximum:
+            raise ValueError(f"{setting_id} must be between {minimum} and {maximum}")
+        return setting_value
+
+    def flush_pending_controls(self):
+        with self.pending_controls_lock:
+            pending = self.pending_controls
+            self.pending_controls = {}
+            self.pending_controls_timer = None
+        if not pending:
+            return
+        controls = {setting_id: value for setting_id, (value, _) in pending.items()}
+        try:
+            self.picam2.set_controls(controls)
+            print(f"Applied {len(controls)} batched control(s): {controls}")
+            return
+        except Exception as e:
+            print(f"⚠️ Error applying batched controls, retrying one by one: {e}")
+        # One bad control must not drop the rest of the batch
+        for setting_id, (value, previous_value) in pending.items():
+            try:
+                self.picam2.set_controls({setting_id: value})
+            except Exception as e:
+                print(f"⚠️ Error applying control {setting_id} -> {value}: {e}")
+                # Put back the value the camera is actually using
+                if previous_value is None:
+                    self.camera_profile["controls"].pop(setting_id, None)
+                    self.set_live_control_value(setting_id, self.picam2.camera_controls[setting_id][2])
+                else:
+                    self.camera_profile["controls"][setting_id] = previous_value
+                    self.set_live_control_value(setting_id, previous_value)
+
+    def set_live_control_value(self, setting_id, setting_value):
+        setting = self.control_index.get(setting_id)
+        if setting is None:
+            print(f"⚠️ Warning: Setting {setting_id} not found in live_controls!")
+            return False
+        setting["value"] = setting_value
+        return True
+
     def sync_live_controls(self):
         """Updates self.live_controls to match self.camera_profile without resetting defaults."""
-        for section in self.live_controls.get("sections", []):
-            for setting in section.get("settings", []):
-                setting_id = setting["id"]
-                if setting_id in self.camera_profile["controls"]:
-                    setting["value"] = self.camera_profile["controls"][setting_id]
-                # Sync child settings
-                for child in setting.get("childsettings", []):
-                    child_id = child["id"]
-                    if child_id in self.camera_profile["controls"]:
-                        child["value"] = self.camera_profile["controls"][child_id]
+        for setting_id, setting_value in self.camera_profile["controls"].items():
+            setting = self.control_index.get(setting_id)
+            if setting is not None:
+                setting["value"] = setting_value
         print("✅ Live controls updated to match camera profile.")
 
     def apply_profile_controls(self):
         if "controls" in self.camera_profile:
             try:
+                # Send every control in one call, then mirror them into live_controls
+                self.picam2.set_controls(dict(self.camera_profile["controls"]))
                 for setting_id, setting_value in self.camera_profile["controls"].items():
-                    self.picam2.set_controls({setting_id: setting_value})
-                    self.update_settings(setting_id, setting_value)  # ✅ Use the loop variables
+                    self.set_live_control_value(setting_id, setting_value)
                     print(f"Applied Control: {setting_id} -> {setting_value}")
                 print("✅ All profile controls applied successfully")
             except Exception as e:
@@ -521,7 +1295,9 @@ class CameraObject:
         self.video_config['transform'] = transform
         print("Applied Orientation - hflip:", transform.hflip, "vflip:", transform.vflip)
     
+    @camera_command(merge_key="sensor_mode")
     def set_sensor_mode(self, mode_index):
+        self.check_reconfigure_allowed()
         try:
             # Ensure setting_value is an integer (mode index)
             mode_index = int(mode_index)
@@ -536,27 +1312,37 @@ class CameraObject:
                 sensor={'output_size': mode['size'], 'bit_depth': mode['bit_depth']}
             )
             self.video_config = self.picam2.create_video_configuration(
-                main={"size": mode['size']}, sensor={'output_size': mode['size'], 'bit_depth': mode['bit_depth']}
+                main={"size": mode['size']}, lores=self.generate_lores_config(mode['size']),
+                sensor={'output_size': mode['size'], 'bit_depth': mode['bit_depth']}
             )
-            self.configure_video_config()  # Apply new configuration
+            self.update_camera_config()  # Restarts only if the video config changed
         except Exception as e:
             print(f"Error saving profile: {e}")
         
 
+    def generate_lores_config(self, main_size):
+        """Size the optional lores stream to lores_max_width keeping the main stream aspect ratio."""
+        if not lores_max_width or main_size[0] <= lores_max_width:
+            return None
+        width = lores_max_width
+        height = int(main_size[1] * width / main_size[0]) & ~1  # Keep height even for YUV420
+        return {"size": (width, height)}
+
+    @camera_command(merge_key="live_feed_resolution")
     def set_live_feed_resolution(self, resolution_index):
-        with self.sensor_mode_lock:  # Prevent conflicts with sensor mode changes
-            # Ensure resolution_index is an integer
-            resolution_index = int(resolution_index)
-            if resolution_index < 0 or resolution_index >= len(self.camera_resolutions):
-                raise ValueError("Invalid resolution index")
-            
-            resolution = self.camera_resolutions[resolution_index]
-            print(f"Setting live feed resolution to: {resolution}")
+        self.check_reconfigure_allowed()
+        # Ensure resolution_index is an integer
+        resolution_index = int(resolution_index)
+        if resolution_index < 0 or resolution_index >= len(self.camera_resolutions):
+            raise ValueError("Invalid resolution index")
+        
+        resolution = self.camera_resolutions[resolution_index]
+        print(f"Setting live feed resolution to: {resolution}")
 
-            # Update video config
-            self.video_config = self.picam2.create_video_configuration(main={"size": resolution})
-            # Apply new configuration
-            self.configure_video_config()
+        # Update video config
+        self.video_config = self.picam2.create_video_configuration(main={"size": resolution}, lores=self.generate_lores_config(resolution))
+        # Apply new configuration, restarts only if the video config changed
+        self.update_camera_config()
 
     def update_camera_from_metadata(self):
         metadata = self.capture_metadata()
@@ -566,18 +1352,8 @@ class CameraObject:
         if "sections" not in self.live_controls:
             print("Error: 'sections' key not found in live_controls!")
             return
-        enabled_controls = {}
-        # Extract enabled settings (including childsettings)
-        for section in self.live_controls["sections"]:
-            for setting in section.get("settings", []):
-                if setting.get("enabled", False) and setting.get("source") == "controls":
-                    enabled_controls[setting["id"]] = True
-                # Check and include childsettings
-                for child in setting.get("childsettings", []):
-                    if child.get("enabled", False) and child.get("source") == "controls":
-                        enabled_controls[child["id"]] = True
-        # Update only enabled settings from metadata
-        for key in enabled_controls:
+        # Update only enabled settings (including childsettings) from metadata
+        for key in self.enabled_control_ids:
             if key in metadata:
                 self.camera_profile["controls"][key] = metadata[key]
                 self.update_settings(key, metadata[key])
@@ -590,31 +1366,14 @@ class CameraObject:
             # Ensure .json is not already in the filename
             if filename.lower().endswith(".json"):
                 filename = filename[:-5]
-            profile_path = os.path.join(camera_profile_folder, f"{filename}.json")
             # Save the profile
-            with open(profile_path, "w") as f:
-                json.dump(self.camera_profile, f, indent=4)
+            profile_store.save(f"{filename}.json", self.camera_profile)
             # ✅ Update camera-last-config.json
             try:
-                if os.path.exists(last_config_file_path):
-                    with open(last_config_file_path, "r") as f:
-                        last_config = json.load(f)
-                else:
-                    last_config = {"cameras": []}  # Create an empty structure if missing
                 # Find the camera entry matching the current camera number
                 camera_num = self.camera_info["Num"]
-                updated = False
-                for camera in last_config["cameras"]:
-                    if camera["Num"] == camera_num:
-                        camera["Has_Config"] = True
-                        camera["Config_Location"] = f"{filename}.json"  # Set the new config file
-                        updated = True
-                        break
-                if not updated:
+                if not profile_store.set_camera_profile(camera_num, f"{filename}.json"):
                     print(f"Warning: Camera {camera_num} not found in camera-last-config.json.")
-                # Save the updated configuration back
-                with open(last_config_file_path, "w") as f:
-                    json.dump(last_config, f, indent=4)
                 print(f"Updated camera-last-config.json for camera {camera_num} after saving profile.")
             except Exception as e:
                 print(f"Error updating camera-last-config.json: {e}")
@@ -623,8 +1382,10 @@ class CameraObject:
             print(f"Error saving profile: {e}")
             return False
 
+    @camera_command(merge_key="reset_profile")
     def reset_to_default(self):
         # Resets camera settings to default and applies them.
+        self.check_reconfigure_allowed()
         self.camera_profile = {
             "hflip": 0,
             "vflip": 0,
@@ -645,6 +1406,7 @@ class CameraObject:
         self.update_camera_from_metadata()
         # Apply the default settings using the new function
         self.apply_profile_controls()
+        self.invalidate_page_context()
         print("Camera profile reset to default and settings applied.")
 
     #-----
@@ -652,14 +1414,41 @@ class CameraObject:
     #-----
 
     def capture_metadata(self):
-        self.metadata = self.picam2.capture_metadata()
-        #print(f"Metadata: {self.metadata}")
-        print(self.picam2.sensor_resolution)
+        if not self.picam2.started:
+            return self.metadata  # Camera is suspended, return the last known metadata
+        if time.monotonic() - self.metadata_hub.updated < 1:
+            self.metadata = self.metadata_hub.metadata  # Recent frame seen by on_frame_metadata
+        else:
+            self.metadata = self.picam2.capture_metadata()
         return self.metadata
 
+    def on_frame_metadata(self, request):
+        # picamera2 post_callback, runs for every completed frame
+        metadata = request.get_metadata()
+        self.metadata_hub.update(metadata)
+        self.metadata_history.add(metadata)
+
+    def generate_metadata_events(self):
+        """Server-Sent Events: one full metadata snapshot, then only the changed metadata_stream_fields."""
+        hub = self.metadata_hub
+        last_sequence = hub.sequence
+        snapshot = hub.metadata or self.metadata
+        sent = hub.pick_values(snapshot)
+        yield f"event: snapshot\ndata: {json.dumps(snapshot, default=str)}\n\n"
+        while True:
+            sequence, values = hub.wait_for_update(last_sequence, timeout=15)
+            if sequence == last_sequence:
+                yield ": keepalive\n\n"  # Lets the server notice closed connections
+                continue
+            last_sequence = sequence
+            changes = {key: value for key, value in values.items() if sent.get(key) != value}
+            if changes:
+                sent.update(changes)
+                yield f"data: {json.dumps(changes, default=str)}\n\n"
+
     def get_camera_module_spec(self):
         # Find and return the camera module details based on the sensor model.
-        camera_module = next((cam for cam in camera_module_info["camera_modules"] if cam["sensor_model"] == self.camera_info["Model"]), None)
+        camera_module = camera_modules_by_model.get(self.camera_info["Model"])
         return camera_module
 
     def get_sensor_mode(self):
@@ -719,58 +1508,53 @@ class CameraObject:
     # Camera Streaming Functions
     #-----
     
-    def generate_stream(self):
-        last_resolution = None  # Track last known resolution
+    def generate_stream(self, max_fps=None, quality="high"):
+        # Per-client frame cap, frames produced in between are skipped for this client only
+        min_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0
+
+        self.acquire_stream()
+        try:
+            yield from self.stream_frames(quality, min_interval)
+        finally:
+            # Runs when the client disconnects and the generator is closed
+            self.release_stream()
+
+    def stream_frames(self, quality, min_interval):
+        last_sequence = 0  # Sequence number of the last frame sent to this client
+        config_epoch = self.config_epoch  # Video configuration this client last saw
+        last_sent = 0
 
         while True:
-            if self.capturing_still:
-                frame = self.placeholder_frame
+            hub = self.get_stream_hub(quality)
+            if self.capturing_still or hub is None or not self.streaming:
+                chunk = self.placeholder_chunk
+                time.sleep(0.1)
             else:
-                with self.output.condition:
-                    self.output.condition.wait()
-                    frame = self.output.read_frame()
-
-                # 🚨 Handle invalid frames
-                if frame is None:
-                    print("🚨 Error: read_frame() returned None! Using placeholder.")
-                    frame = self.placeholder_frame
-                    continue  
-
-                if not isinstance(frame, bytes):
-                    print(f"⚠️ Warning: Frame is not bytes! Type: {type(frame)}")
-                    frame = self.placeholder_frame
-                    continue  
-
-                # ✅ Extract actual frame resolution from metadata
-                config = self.picam2.stream_configuration("main")
-                if config is None:
-                    print("🚨 stream_configuration returned None! Skipping frame...")
-                    frame = self.placeholder_frame
-                    continue  
-
-                actual_resolution = config["size"]
-                expected_resolution = self.video_config["main"]["size"]
-
-                # 🚨 Detect resolution mismatch
-                if last_resolution is None or actual_resolution != expected_resolution:
-                    print(f"🔄 Resolution change detected: {last_resolution} → {expected_resolution}")
-                    last_resolution = expected_resolution  # Update last known resolution
-
-                    # 🧹 CLEAR BUFFER to avoid old mismatched frames
-                    self.picam2.stop()
-                    self.picam2.start(show_preview=False)  # Restart stream cleanly
-                    print("✅ Buffer cleared. Restarting stream with new resolution...")
-                    continue  # Skip current frame after restart
-
-                # ✅ Check resolution before sending frame
-                if actual_resolution != expected_resolution:
-                    print(f"⚠️ Skipping frame due to resolution mismatch: {actual_resolution} expected: {expected_resolution}")
-                    frame = self.placeholder_frame
-                    continue  
+                # After a reconfiguration skip any frame still held from the old configuration
+                if config_epoch != self.config_epoch:
+                    config_epoch = self.config_epoch
+                    last_sequence = max(last_sequence, hub.epoch_sequence)
+                # Every subscriber receives the same immutable chunk from the hub
+                sequence, chunk = hub.wait_for_frame(last_sequence, timeout=1)
+                if sequence == last_sequence or chunk is None:
+                    continue  # Timed out without a new frame
+                last_sequence = sequence
 
             # Send frame to the stream
-            yield (b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+            yield chunk
+
+            # Throttle this client, the next wait always picks up the newest frame
+            if min_interval:
+                elapsed = time.monotonic() - last_sent
+                if elapsed < min_interval:
+                    time.sleep(min_interval - elapsed)
+                last_sent = time.monotonic()
+
+    def get_stream_hub(self, quality="high"):
+        # Fall back to the main stream when no lores stream is configured
+        if quality == "low" and self.lores_output is not None and self.video_config.get("lores"):
+            return self.lores_output
+        return self.output
 
     def oldgenerate_stream(self):
         while True:
@@ -807,25 +1591,162 @@ class CameraObject:
         return buf.getvalue()
 
     def start_streaming(self):
-        self.output = StreamingOutput()
-        self.picam2.start_recording(MJPEGEncoder(), output=FileOutput(self.output))
-        print("[INFO] Streaming started")
-        time.sleep(1)
+        with self.stream_lock:
+            if self.stream_override is False:
+                print("[INFO] Streaming disabled by manual override")
+                return
+            # Reuse the hub across restarts so connected subscribers keep waiting on the same object
+            if self.output is None:
+                self.output = FrameHub()
+            started = time.monotonic()
+            last_sequence = self.output.sequence
+            if self.picam2.started:
+                # Kept running by metadata_history_keep_running, only the encoder was stopped
+                self.picam2.start_encoder(MJPEGEncoder(), FileOutput(self.output))
+            else:
+                self.picam2.start_recording(MJPEGEncoder(), output=FileOutput(self.output))
+            # Encode the lores stream separately so low quality clients need no CPU rescaling
+            if self.video_config.get("lores"):
+                if self.lores_output is None:
+                    self.lores_output = FrameHub()
+                self.picam2.start_encoder(MJPEGEncoder(), FileOutput(self.lores_output), name="lores")
+            self.streaming = True
+            # Suspend again later if nobody is watching
+            if self.stream_subscribers == 0:
+                self.schedule_idle_suspend()
+        # Ready once the encoder has delivered its first frame
+        if self.output.wait_for_first_frame(last_sequence, stream_ready_timeout):
+            self.last_stream_start_latency = time.monotonic() - started
+            print(f"[INFO] Streaming started, first frame after {self.last_stream_start_latency * 1000:.0f} ms")
+        else:
+            print(f"⚠️ Warning: No frame within {stream_ready_timeout}s of starting the stream")
 
     def stop_streaming(self):
-        if self.output:  # Ensure streaming was started before stopping
-            self.picam2.stop_recording()
-            print("[INFO] Streaming stopped")
+        with self.stream_lock:
+            if self.streaming:  # Ensure streaming was started before stopping
+                self.picam2.stop_recording()
+                self.streaming = False
+                print("[INFO] Streaming stopped")
+
+    def acquire_stream(self):
+        """
+        Register a feed subscriber. The encoder is started on the command thread so it never
+        races a reconfiguration or still capture, returns the future of that start.
+        """
+        with self.stream_lock:
+            self.stream_subscribers += 1
+            if self.idle_timer:
+                self.idle_timer.cancel()
+                self.idle_timer = None
+        return self.commands.submit(self.resume_streaming, merge_key="resume_stream")
+
+    def resume_streaming(self):
+        # Camera command, a capture restarts the feed itself when it finishes
+        with self.stream_lock:
+            if self.streaming or self.capturing_still:
+                return
+            if self.stream_subscribers or self.stream_override is True:
+                self.start_streaming()
+
+    def release_stream(self):
+        with self.stream_lock:
+            self.stream_subscribers = max(self.stream_subscribers - 1, 0)
+            if self.stream_subscribers == 0:
+                self.schedule_idle_suspend()
+
+    def schedule_idle_suspend(self):
+        # Called with stream_lock held
+        if not stream_idle_timeout or self.stream_override is True:
+            return
+        if self.idle_timer:
+            self.idle_timer.cancel()
+        self.idle_timer = threading.Timer(stream_idle_timeout, lambda: self.commands.submit(self.suspend_if_idle, merge_key="suspend"))
+        self.idle_timer.daemon = True
+        self.idle_timer.start()
+
+    def suspend_if_idle(self):
+        with self.stream_lock:
+            self.idle_timer = None
+            if self.stream_subscribers or self.capturing_still or self.stream_override is True:
+                return
+            if self.streaming and metadata_history_keep_running:
+                # Only the encoders stop, frames and their metadata keep coming
+                print(f"[INFO] No viewers for {stream_idle_timeout}s, stopping the encoder of camera {self.camera_info['Num']}")
+                self.picam2.stop_encoder()
+                self.streaming = False
+            elif self.streaming:
+                print(f"[INFO] No viewers for {stream_idle_timeout}s, suspending camera {self.camera_info['Num']}")
+                self.stop_streaming()
+
+    @camera_command(merge_key="stream_override")
+    def set_stream_override(self, override):
+        """Manual streaming override: True keeps the encoder running, False keeps it off, None is automatic."""
+        with self.stream_lock:
+            self.stream_override = override
+            if override is False:
+                self.stop_streaming()
+            elif self.capturing_still:
+                return  # The camera is in the still configuration, the capture restarts the feed
+            elif override is True or self.stream_subscribers:
+                if not self.streaming:
+                    self.start_streaming()
+            else:
+                self.schedule_idle_suspend()
 
     #-----
     # Camera Capture Functions
     #-----
 
+    def can_capture_from_feed(self):
+        """Check if the still config can be served by the running video pipeline without a mode switch."""
+        if not self.picam2.started or self.camera_profile["saveRAW"]:
+            return False  # DNGs still go through the full still configuration
+        still_size = self.still_config["main"]["size"]
+        video_size = self.video_config["main"]["size"]
+        if still_size[0] > video_size[0] or still_size[1] > video_size[1]:
+            return False
+        # Only downscale when the framing is the same
+        if abs(still_size[0] / still_size[1] - video_size[0] / video_size[1]) > 0.01:
+            return False
+        still_sensor = self.still_config.get("sensor") or {}
+        video_sensor = self.video_config.get("sensor") or {}
+        return not still_sensor.get("output_size") or still_sensor.get("output_size") == video_sensor.get("output_size")
+
+    def take_still_fast(self, filepath):
+        """Capture from the running video pipeline, the live feed keeps going."""
+        request = self.picam2.capture_request()
+        try:
+            image = request.make_image("main")
+            metadata = request.get_metadata()
+        finally:
+            request.release()
+        still_size = tuple(self.still_config["main"]["size"])
+        if image.size != still_size:
+            image = image.resize(still_size)
+        self.picam2.helpers.save(image.convert("RGB"), metadata, f"{filepath}.jpg")
+        return f"{filepath}.jpg"
+
+    @camera_command()
     def take_still(self, camera_num, image_name):
+        if self.can_capture_from_feed():
+            try:
+                filepath = os.path.join(app.config['upload_folder'], image_name)
+                self.take_still_fast(filepath)
+                self.last_capture_method = "feed"
+                print(f"Image captured from running feed. Path: {filepath}")
+                return f'{filepath}.jpg'
+            except Exception as e:
+                print(f"Error capturing image from feed, falling back to mode switch: {e}")
+        self.last_capture_method = "mode_switch"
         try:
-            self.capturing_still = True  # Start sending placeholder frames
-            time.sleep(0.5)  # Short delay to allow clients to receive the placeholder
+            # Checked before stop_streaming, which stops the camera as well
+            was_started = self.picam2.started
+            was_streaming = self.streaming  # False when only the encoder was suspended
+            self.pause_stream_clients()  # Start sending placeholder frames
             self.stop_streaming()
+            # A suspended camera delivers no frames, switch_mode_and_capture needs it running
+            if not self.picam2.started:
+                self.picam2.start()
             filepath = os.path.join(app.config['upload_folder'], image_name)
             # This will be the new way to save images at max quality just need to make the save as DNG setting available
             buffers, metadata = self.picam2.switch_mode_and_capture_buffers(self.still_config, ["main", "raw"])
@@ -836,9 +1757,12 @@ class CameraObject:
             # Switch to still mode and capture the image
             #self.picam2.switch_mode_and_capture_file(self.still_config, f"{filepath}.jpg")
             print(f"Image captured successfully. Path: {filepath}")
-            # Restart video mode
-            self.start_streaming()
-            print("Applied video config:", self.picam2.camera_configuration())
+            if was_streaming:
+                # Restart video mode
+                self.start_streaming()
+                print("Applied video config:", self.picam2.camera_configuration())
+            elif not was_started:
+                self.picam2.stop()  # Back to suspended
              
             self.capturing_still = False
             return f'{filepath}.jpg'
@@ -846,11 +1770,123 @@ class CameraObject:
             print(f"Error capturing image: {e}")
             return None
 
+    @camera_command()
+    def start_still_session(self):
+        """Stop the live feed and hold the sensor in the still configuration for repeated shots."""
+        self.check_reconfigure_allowed()
+        self.still_session = True
+        self.pause_stream_clients()
+        self.stop_streaming()
+        self.picam2.stop()  # Still running if only the encoder was suspended
+        self.set_still_config()
+        self.picam2.start()
+
+    @camera_command()
+    def end_still_session(self):
+        self.picam2.stop()
+        self.set_video_config()
+        self.still_session = False
+        self.start_streaming()
+        self.capturing_still = False
+
+    def save_still_buffers(self, still_config, main_buffer, raw_buffer, metadata, filepath):
+        image = self.picam2.helpers.make_image(main_buffer, still_config["main"])
+        self.picam2.helpers.save(image, metadata, f"{filepath}.jpg")
+        if raw_buffer is not None:
+            self.picam2.helpers.save_dng(raw_buffer, metadata, still_config["raw"], f"{filepath}.dng")
+        return f"{filepath}.jpg"
+
+    def capture_to_pool(self, image_name, on_image=None):
+        """Grab one request from the running still pipeline and encode it in the worker pool."""
+        filepath = os.path.join(app.config['upload_folder'], image_name)
+        still_config = self.still_config
+        self.encode_slots.acquire()  # Wait here if the encoders are falling behind
+        try:
+            request = self.picam2.capture_request()
+            try:
+                main_buffer = request.make_buffer("main")
+                raw_buffer = request.make_buffer("raw") if self.camera_profile["saveRAW"] else None
+                metadata = request.get_metadata()
+            finally:
+                request.release()
+        except Exception:
+            self.encode_slots.release()
+            raise
+
+        def encode():
+            # on_image runs inside the task so the image is recorded before the future resolves
+            try:
+                image_path = self.save_still_buffers(still_config, main_buffer, raw_buffer, metadata, filepath)
+                if on_image:
+                    on_image(image_path)
+                return image_path
+            except Exception as e:
+                print(f"Error encoding image {image_name}: {e}")
+                raise
+            finally:
+                self.encode_slots.release()
+        return self.encode_executor.submit(encode)
+
+    @camera_command()
+    def capture_still_shot(self, image_name, on_image=None):
+        # One shot of a burst or time-lapse, queued on its own so other commands can run in between
+        return self.capture_to_pool(image_name, on_image)
+
+    def capture_burst(self, image_prefix, count, on_image=None, cancel=None):
+        """
+        Capture count frames at the sensor's full rate, encoding overlaps with capture.
+        Runs on the capture queue thread, the camera command thread is only held per shot.
+        """
+        cancel = cancel or threading.Event()
+        futures = []
+        self.start_still_session()
+        try:
+            timestamp = int(time.time())
+            for shot in range(count):
+                if cancel.is_set():
+                    break
+                # Keep the unix timestamp last so the gallery can date the image
+                futures.append(self.capture_still_shot(f"{image_prefix}_burst{shot + 1:03d}_{timestamp}", on_image))
+        finally:
+            self.end_still_session()
+        return [f.result() for f in futures if not f.exception()]
+
+    def capture_timelapse(self, image_prefix, interval, count=None, end_time=None, on_image=None, cancel=None):
+        """
+        Capture a frame every interval seconds until count frames are taken or end_time passes.
+        Waits between shots on the capture queue thread, not the camera command thread.
+        """
+        cancel = cancel or threading.Event()
+        futures = []
+        self.start_still_session()
+        try:
+            next_shot = time.monotonic()
+            while (count is None or len(futures) < count) and (end_time is None or time.time() < end_time):
+                if cancel.is_set():
+                    break
+                futures.append(self.capture_still_shot(f"{image_prefix}_tl{len(futures) + 1:04d}_{int(time.time())}", on_image))
+                # Sleep until the next shot, waking early if the job is cancelled
+                next_shot += interval
+                delay = next_shot - time.monotonic()
+                if delay > 0 and cancel.wait(delay):
+                    break
+        finally:
+            self.end_still_session()
+        return [f.result() for f in futures if not f.exception()]
+
+    @camera_command()
     def take_still_from_feed(self, camera_num, image_name):
+        """Save the next frame of the running pipeline, callers hold acquire_stream so a suspended camera is resumed first."""
+        if not self.picam2.started:
+            # Streaming is switched off by the override, take a normal still instead
+            return self.take_still(camera_num, image_name)
         try:
             filepath = os.path.join(app.config['upload_folder'], image_name)
             request = self.picam2.capture_request()
-            request.save("main", f'{filepath}.jpg')
+            try:
+                request.save("main", f'{filepath}.jpg')
+            finally:
+                request.release()
             print(f"Image captured successfully. Path: {filepath}")
             return f'{filepath}.jpg'
         except Exception as e:
@@ -891,84 +1927,509 @@ class GPIO:
         """Return GPIO configuration as a list of dictionaries."""
         return self.gpio_pins
 
+####################
+# Export Queue
+####################
+
+# Every export job by id, /export_status only needs the job id
+export_jobs = OrderedDict()
+export_jobs_lock = threading.Lock()
+max_export_jobs = 100
+max_export_batch = 500
+
+class ExportQueue:
+    """
+    Renders full resolution edits in a process pool so the PIL work doesn't hold the GIL
+    against the streaming threads. A job covers one or more files and reports progress
+    as each file finishes.
+    """
+    def __init__(self, gallery, workers=export_workers):
+        self.gallery = gallery
+        self.workers = workers
+        self.pool = None  # Started on first use
+        self.pool_lock = threading.Lock()
+        self.futures = {}  # job id -> futures of the files still pending
+
+    def get_pool(self):
+        with self.pool_lock:
+            if self.pool is None:
+                # spawn starts clean interpreters, forking would copy the camera threads and their buffer fds
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.pool
+
+    def submit(self, items, edits):
+        """Queue one export job, items is a list of (filename, save_filename)."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "edits": edits,
+            "status": "queued",
+            "message": "Waiting for export worker",
+            "total": len(items),
+            "completed": 0,
+            "failed": 0,
+            "progress": 0,
+            "files": [{"filename": filename, "saved_as": save_filename, "status": "queued"} for filename, save_filename in items],
+            "queued_at": time.time(),
+            "finished_at": None
+        }
+        with export_jobs_lock:
+            export_jobs[job["id"]] = job
+            # Keep the job history bounded
+            while len(export_jobs) > max_export_jobs:
+                export_jobs.popitem(last=False)
+        pool = self.get_pool()
+        job["status"] = "running"
+        job["message"] = f"Exporting {job['total']} image(s)"
+        futures = self.futures[job["id"]] = []
+        for file in job["files"]:
+            future = pool.submit(export_edit, os.path.join(self.gallery.upload_folder, file["filename"]),
+                                 edits, os.path.join(self.gallery.upload_folder, file["saved_as"]))
+            futures.append(future)
+            future.add_done_callback(functools.partial(self.file_done, job, file))
+        return job
+
+    def file_done(self, job, file, future):
+        # Runs on the pool's result thread
+        if future.cancelled():
+            file["status"] = "cancelled"
+        elif future.exception():
+            logging.error(f"🔥 Error exporting {file['filename']}: {future.exception()}")
+            file["status"] = "failed"
+        else:
+            file["status"] = "done"
+            self.gallery.add_image(file["saved_as"])
+        with export_jobs_lock:
+            if file["status"] == "done":
+                job["completed"] += 1
+            elif file["status"] == "failed":
+                job["failed"] += 1
+            finished = sum(1 for f in job["files"] if f["status"] != "queued")
+            job["progress"] = round(finished / job["total"], 3)
+            if finished < job["total"]:
+                return
+            self.futures.pop(job["id"], None)
+            job["finished_at"] = time.time()
+            if job["completed"] == job["total"]:
+                job["status"] = "done"
+                job["message"] = f"{job['completed']} image(s) saved successfully"
+            elif job["completed"]:
+                job["status"] = "partial"
+                job["message"] = f"{job['completed']} of {job['total']} image(s) saved"
+            else:
+                job["status"] = "cancelled" if any(f["status"] == "cancelled" for f in job["files"]) else "failed"
+                job["message"] = "Export cancelled" if job["status"] == "cancelled" else "Failed to edit image."
+
+    def cancel(self, job_id):
+        """Drop the files of a job that haven't started yet, returns False if nothing was pending."""
+        futures = self.futures.get(job_id, [])
+        return any([future.cancel() for future in futures])
+
 ####################
 # ImageGallery Class
 ####################
 
 class ImageGallery:
-    def __init__(self, upload_folder, items_per_page=10):
+    def __init__(self, upload_folder, items_per_page=10, index_path=None):
         self.upload_folder = upload_folder
         self.items_per_page = items_per_page
         self.items_per_page = 12
+        # Persistent index of gallery images so page loads don't rescan and reopen every file
+        self.index_path = index_path or os.path.join(upload_folder, 'gallery-index.json')
+        # Single image changes are appended here instead of rewriting the whole index
+        self.log_path = f"{os.path.splitext(self.index_path)[0]}.log"
+        self.log_length = 0
+        self.index_lock = threading.RLock()
+        self.index = {}  # filename -> image details
+        self.sorted_files = []  # filenames, newest first
+        self.version = 0  # Bumped whenever the index changes
+        self.folder_mtime = None
+        self.last_rescan = 0  # time.monotonic() of the last per-file check, see reconcile
+        self.load_index()
+        # Thumbnails are cached on disk and rendered by a small background pool
+        self.thumbnail_folder = os.path.join(upload_folder, 'thumbnails')
+        os.makedirs(self.thumbnail_folder, exist_ok=True)
+        self.thumbnail_executor = ThreadPoolExecutor(max_workers=2)
+        self.thumbnail_jobs = {}  # (filename, size) -> pending future
+        self.thumbnail_lock = threading.Lock()
+        # Decoded editor proxies, (filename, mtime) -> RGB image, least recently used first
+        self.edit_proxies = OrderedDict()
+        self.edit_proxy_lock = threading.Lock()
+        # Full resolution edits run in background processes
+        self.exports = ExportQueue(self)
+        # Edited images are rendered from the original and their sidecar, cached by (file, edit hash, size)
+        self.render_folder = os.path.join(upload_folder, 'renders')
+        os.makedirs(self.render_folder, exist_ok=True)
 
-    def get_image_files(self):
-         # Fetch image file details, including timestamps, resolution, and DNG presence.
+    #-----
+    # Gallery Index Functions
+    #-----
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            self.index = data.get('images', {})
+            self.folder_mtime = data.get('folder_mtime')
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            self.index = {}
+            self.folder_mtime = None
+        # Replay changes made since the index file was last written
+        try:
+            with open(self.log_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # Torn last line after a crash
+                    if record.get('entry'):
+                        self.index[record['entry']['filename']] = record['entry']
+                    else:
+                        self.index.pop(record.get('removed'), None)
+                    self.folder_mtime = record.get('folder_mtime', self.folder_mtime)
+                    self.log_length += 1
+        except FileNotFoundError:
+            pass
+        self.sort_index()
+
+    def save_index(self):
+        # Write to a temp file and rename so a crash never leaves a truncated index, the log is folded in
         try:
-            image_files = [f for f in os.listdir(self.upload_folder) if f.endswith('.jpg')]
-            files_and_timestamps = []
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'folder_mtime': self.folder_mtime, 'images': self.index}, f)
+            os.replace(tmp_path, self.index_path)
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+            self.log_length = 0
+        except OSError as e:
+            logging.error(f"Error saving gallery index: {e}")
+
+    def append_log(self, record):
+        # Called with index_lock held, replaying a record twice is harmless
+        try:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            self.log_length += 1
+        except OSError as e:
+            logging.error(f"Error writing gallery index log: {e}")
+        if self.log_length >= gallery_log_compact_lines:
+            self.save_index()
+
+    def sort_key(self, filename):
+        # Newest first, by the unix timestamp at the end of the filename (see build_entry)
+        return -int(filename.split('_')[-1].split('.')[0])
+
+    def sort_index(self):
+        # Sort files by timestamp (newest first)
+        self.sorted_files = sorted(self.index, key=self.sort_key)
+        self.version += 1
+
+    def note_own_change(self):
+        # The app changed the folder itself, remember its mtime so reconcile doesn't rescan for it
+        try:
+            self.folder_mtime = os.stat(self.upload_folder).st_mtime_ns
+        except OSError:
+            pass
 
+    def build_entry(self, image_file, has_dng=None):
+        """Fetch image file details, including timestamps, resolution, and DNG presence."""
+        # Extract timestamp from filename
+        try:
+            unix_timestamp = int(image_file.split('_')[-1].split('.')[0])
+            timestamp = datetime.utcfromtimestamp(unix_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            logging.warning(f"Skipping file {image_file} due to incorrect timestamp format")
+            return None
+        # Check if corresponding .dng file exists
+        dng_file = os.path.splitext(image_file)[0] + '.dng'
+        if has_dng is None:
+            has_dng = os.path.exists(os.path.join(self.upload_folder, dng_file))
+        # Get image resolution
+        img_path = os.path.join(self.upload_folder, image_file)
+        with Image.open(img_path) as img:
+            width, height = img.size
+        edits = self.load_edits(image_file)
+        if int(edits.get("rotation", 0)) % 180 == 90:
+            width, height = height, width
+        return {
+            'filename': image_file,
+            'timestamp': timestamp,
+            'has_dng': has_dng,
+            'dng_file': dng_file,
+            'width': width,
+            'height': height,
+            'mtime': os.path.getmtime(img_path),
+            'sidecar_mtime': self.sidecar_mtime(image_file),
+            'edit_hash': self.edit_hash(image_file, edits)
+        }
+
+    def reconcile(self):
+        """
+        Bring the index in line with the folder. Rescans when the folder mtime changed, or every
+        gallery_rescan_interval seconds for images and sidecars rewritten in place.
+        """
+        try:
+            folder_mtime = os.stat(self.upload_folder).st_mtime_ns
+        except OSError as e:
+            logging.error(f"Error loading image files: {e}")
+            return
+        with self.index_lock:
+            now = time.monotonic()
+            if folder_mtime == self.folder_mtime and now - self.last_rescan < gallery_rescan_interval:
+                return
+            self.last_rescan = now
+            mtimes = self.scan_mtimes()
+            if mtimes is None:
+                return
+            changed = folder_mtime != self.folder_mtime
+            image_files = {f for f in mtimes if f.endswith('.jpg')}
+            for image_file in set(self.index) - image_files:
+                del self.index[image_file]
+                changed = True
             for image_file in image_files:
-                # Extract timestamp from filename
-                try:
-                    unix_timestamp = int(image_file.split('_')[-1].split('.')[0])
-                    timestamp = datetime.utcfromtimestamp(unix_timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    logging.warning(f"Skipping file {image_file} due to incorrect timestamp format")
-                    continue  # Skip files with incorrect format
+                entry = self.index.get(image_file)
+                stem = os.path.splitext(image_file)[0]
+                has_dng = stem + '.dng' in mtimes
+                # Rebuild new entries and ones whose original or sidecar changed since they were indexed
+                if entry is None or entry['mtime'] != mtimes[image_file] or entry.get('sidecar_mtime') != mtimes.get(stem + '.edits.json'):
+                    try:
+                        entry = self.build_entry(image_file, has_dng)
+                    except Exception as e:
+                        logging.error(f"Error loading image file {image_file}: {e}")
+                        continue
+                    if entry:
+                        self.index[image_file] = entry
+                        changed = True
+                elif entry['has_dng'] != has_dng:
+                    entry['has_dng'] = has_dng
+                    changed = True
+            self.folder_mtime = folder_mtime
+            if changed:
+                self.sort_index()
+                self.save_index()
+
+    def scan_mtimes(self):
+        # One pass over the folder, filename -> mtime in seconds like os.path.getmtime
+        mtimes = {}
+        try:
+            with os.scandir(self.upload_folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            mtimes[entry.name] = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        pass  # Removed while scanning
+        except OSError as e:
+            logging.error(f"Error loading image files: {e}")
+            return None
+        return mtimes
 
-                # Check if corresponding .dng file exists
-                dng_file = os.path.splitext(image_file)[0] + '.dng'
-                has_dng = os.path.exists(os.path.join(self.upload_folder, dng_file))
+    def add_image(self, filename):
+        """Add or refresh a single image in the index after a capture or edit."""
+        try:
+            entry = self.build_entry(filename)
+        except Exception as e:
+            logging.error(f"Error indexing image {filename}: {e}")
+            return
+        if not entry:
+            return
+        with self.index_lock:
+            if filename not in self.index:
+                bisect.insort(self.sorted_files, filename, key=self.sort_key)
+            self.index[filename] = entry
+            self.version += 1
+            self.note_own_change()
+            self.append_log({'entry': entry, 'folder_mtime': self.folder_mtime})
+        self.queue_thumbnails(filename)
+
+    def remove_image(self, filename):
+        with self.index_lock:
+            if self.index.pop(filename, None) is not None:
+                self.sorted_files.remove(filename)
+                self.version += 1
+                self.note_own_change()
+                self.append_log({'removed': filename, 'folder_mtime': self.folder_mtime})
 
-                # Get image resolution
-                img_path = os.path.join(self.upload_folder, image_file)
-                with Image.open(img_path) as img:
-                    width, height = img.size
-
-                # Append file details
-                files_and_timestamps.append({
-                    'filename': image_file,
-                    'timestamp': timestamp,
-                    'has_dng': has_dng,
-                    'dng_file': dng_file,
-                    'width': width,
-                    'height': height
-                })
-
-            # Sort files by timestamp (newest first)
-            files_and_timestamps.sort(key=lambda x: x['timestamp'], reverse=True)
-            return files_and_timestamps
+    #-----
+    # Thumbnail Functions
+    #-----
 
-        except Exception as e:
-            logging.error(f"Error loading image files: {e}")
-            return []
+    def thumbnail_path(self, filename, size):
+        return os.path.join(self.thumbnail_folder, f"{os.path.splitext(filename)[0]}_{size}.jpg")
+
+    def is_thumbnail_fresh(self, filename, size):
+        # A cached thumbnail is only valid if it is newer than the original
+        thumb_path = self.thumbnail_path(filename, size)
+        image_path = os.path.join(self.upload_folder, filename)
+        return os.path.exists(thumb_path) and os.path.getmtime(thumb_path) >= os.path.getmtime(image_path)
+
+    def generate_thumbnail(self, filename, size):
+        thumb_path = self.thumbnail_path(filename, size)
+        if self.is_thumbnail_fresh(filename, size):
+            return thumb_path
+        with Image.open(os.path.join(self.upload_folder, filename)) as img:
+            img.draft("RGB", (size, size))  # Let the JPEG decoder downscale while decoding
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((size, size))
+            tmp_path = f"{thumb_path}.tmp"
+            img.convert("RGB").save(tmp_path, format="JPEG", quality=80)
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+
+    def submit_thumbnail(self, filename, size):
+        # Share one pending job per thumbnail so concurrent requests don't render it twice
+        key = (filename, size)
+        with self.thumbnail_lock:
+            future = self.thumbnail_jobs.get(key)
+            if future is None:
+                future = self.thumbnail_executor.submit(self.generate_thumbnail, filename, size)
+                self.thumbnail_jobs[key] = future
+                future.add_done_callback(lambda f: self.thumbnail_jobs.pop(key, None))
+        return future
+
+    def queue_thumbnails(self, filename):
+        """Render every thumbnail size in the background, used after a capture or edit."""
+        for size in thumbnail_sizes:
+            self.submit_thumbnail(filename, size)
+
+    def get_thumbnail(self, filename, size):
+        if self.is_thumbnail_fresh(filename, size):
+            return self.thumbnail_path(filename, size)
+        return self.submit_thumbnail(filename, size).result()
+
+    def delete_thumbnails(self, filename):
+        for size in (*thumbnail_sizes, edit_preview_size):
+            thumb_path = self.thumbnail_path(filename, size)
+            if os.path.exists(thumb_path):
+                os.remove(thumb_path)
+
+    #-----
+    # Edit Sidecar Functions
+    #-----
+
+    def sidecar_path(self, filename):
+        return os.path.join(self.upload_folder, f"{os.path.splitext(filename)[0]}.edits.json")
+
+    def sidecar_mtime(self, filename):
+        try:
+            return os.path.getmtime(self.sidecar_path(filename))
+        except OSError:
+            return None
+
+    def load_edits(self, filename):
+        """Edits stored next to the image, {} for an unedited image."""
+        try:
+            with open(self.sidecar_path(filename), 'r') as f:
+                return json.load(f).get('edits', {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            return {}
+
+    def edit_hash(self, filename, edits):
+        # Covers the original's mtime too, so a replaced original never serves an old render
+        if not edits:
+            return None
+        key = json.dumps({'edits': edits, 'mtime': os.path.getmtime(os.path.join(self.upload_folder, filename))}, sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+    def write_edits(self, filename, edits):
+        """Store edits in the image's sidecar, the original file is never touched. Neutral edits remove the sidecar."""
+        sidecar_path = self.sidecar_path(filename)
+        edits = dict(edits)
+        if "rotation" in edits:
+            edits["rotation"] = int(edits["rotation"]) % 360
+        if edits.get("brightness", 100) == 100 and edits.get("contrast", 100) == 100 and not edits.get("rotation"):
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+        else:
+            # Write to a temp file and rename so a crash never leaves a truncated sidecar
+            tmp_path = f"{sidecar_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'edits': edits, 'updated': time.time()}, f)
+            os.replace(tmp_path, sidecar_path)
+        self.delete_renders(filename)
+        self.add_image(filename)
+
+    def render_path(self, filename, edit_hash, size=None):
+        return os.path.join(self.render_folder, f"{os.path.splitext(filename)[0]}__{edit_hash}_{size or 'full'}.jpg")
+
+    def generate_render(self, filename, size=None):
+        edits = self.load_edits(filename)
+        render_path = self.render_path(filename, self.edit_hash(filename, edits), size)
+        if os.path.exists(render_path):
+            return render_path
+        if size:
+            # Edit the cached thumbnail instead of decoding the original, get_render made sure it exists
+            with Image.open(self.thumbnail_path(filename, size)) as img:
+                img = apply_edits(img.convert("RGB"), edits)
+                tmp_path = f"{render_path}.tmp"
+                img.save(tmp_path, format="JPEG", quality=80)
+            os.replace(tmp_path, render_path)
+        else:
+            self.exports.get_pool().submit(export_edit, os.path.join(self.upload_folder, filename), edits, render_path).result()
+        return render_path
+
+    def get_render(self, filename, size=None):
+        """
+        Path of an image as it should be shown, size is a thumbnail size or None for full
+        resolution. Unedited images return the original or its thumbnail, edited ones a render
+        that is generated on first use and reused until the edits change.
+        """
+        entry = self.index.get(filename)
+        edit_hash = entry.get('edit_hash') if entry else self.edit_hash(filename, self.load_edits(filename))
+        if not edit_hash:
+            return self.get_thumbnail(filename, size) if size else os.path.join(self.upload_folder, filename)
+        render_path = self.render_path(filename, edit_hash, size)
+        if os.path.exists(render_path):
+            return render_path
+        if size:
+            self.get_thumbnail(filename, size)  # Rendered from the thumbnail, wait for it outside the pool
+        # Share one pending job per render so concurrent requests don't render it twice
+        with self.thumbnail_lock:
+            future = self.thumbnail_jobs.get(render_path)
+            if future is None:
+                future = self.thumbnail_executor.submit(self.generate_render, filename, size)
+                self.thumbnail_jobs[render_path] = future
+                future.add_done_callback(lambda f: self.thumbnail_jobs.pop(render_path, None))
+        return future.result()
+
+    def delete_renders(self, filename):
+        for render_path in glob.glob(os.path.join(self.render_folder, f"{glob.escape(os.path.splitext(filename)[0])}__*.jpg")):
+            os.remove(render_path)
+
+    #-----
+    # Gallery Functions
+    #-----
+
+    def get_image_files(self):
+        self.reconcile()
+        with self.index_lock:
+            return [self.index[f] for f in self.sorted_files]
 
     def paginate_images(self, page):
         """Paginate images dynamically after an image is deleted."""
-        all_images = self.get_image_files()
-        
-        # Recalculate total pages dynamically
-        total_pages = max((len(all_images) + self.items_per_page - 1) // self.items_per_page, 1)
+        self.reconcile()
+        with self.index_lock:
+            # Recalculate total pages dynamically
+            total_pages = max((len(self.sorted_files) + self.items_per_page - 1) // self.items_per_page, 1)
 
-        # Adjust the current page if necessary
-        if page > total_pages:
-            page = total_pages  # Ensure we're not on a non-existent page
+            # Adjust the current page if necessary
+            if page > total_pages:
+                page = total_pages  # Ensure we're not on a non-existent page
 
-        start_index = (page - 1) * self.items_per_page
-        end_index = start_index + self.items_per_page
-        paginated_images = all_images[start_index:end_index]
+            start_index = (page - 1) * self.items_per_page
+            end_index = start_index + self.items_per_page
+            paginated_images = [self.index[f] for f in self.sorted_files[start_index:end_index]]
 
         return paginated_images, total_pages
     
 
     def find_last_image_taken(self):
         """Find the most recent image taken."""
-        all_images = self.get_image_files()
+        self.reconcile()
         
-        if all_images:
-            first_image = all_images[0]
-            print(f"Filename: {first_image['filename']}")
-            image = first_image['filename']
+        if self.sorted_files:
+            image = self.sorted_files[0]
+            print(f"Filename: {image}")
         else:
             print("No image files found.")
             image = None
@@ -990,6 +2451,11 @@ class ImageGallery:
                 print(has_dng)
                 if has_dng:
                     os.remove(os.path.join(self.upload_folder, dng_file))
+                if os.path.exists(self.sidecar_path(filename)):
+                    os.remove(self.sidecar_path(filename))
+                self.remove_image(filename)  # After every removal in the folder, see note_own_change
+                self.delete_thumbnails(filename)
+                self.delete_renders(filename)
                 return True, f"Image '{filename}' deleted successfully."
             except Exception as e:
                 logging.error(f"Error deleting image {filename}: {e}")
@@ -997,112 +2463,120 @@ class ImageGallery:
         else:
             return False, "Image not found"
     
-    def save_edit(self, filename, edits, save_option, new_filename=None):
-        """Apply edits to an image and save it based on user selection."""
+    #-----
+    # Edit Functions
+    #-----
+
+    def get_edit_proxy(self, filename):
+        """Downscaled copy of an image for previews, cached on disk with the thumbnails and decoded once in memory."""
         image_path = os.path.join(self.upload_folder, filename)
-        print(f"Applying edits to {filename}: {edits}")
+        key = (filename, os.path.getmtime(image_path))
+        with self.edit_proxy_lock:
+            proxy = self.edit_proxies.get(key)
+            if proxy is not None:
+                self.edit_proxies.move_to_end(key)
+                return proxy
+        with Image.open(self.get_thumbnail(filename, edit_preview_size)) as img:
+            proxy = img.convert("RGB")  # Thumbnails are already EXIF transposed
+        with self.edit_proxy_lock:
+            self.edit_proxies[key] = proxy
+            while len(self.edit_proxies) > edit_proxy_cache_size:
+                self.edit_proxies.popitem(last=False)
+        return proxy
+
+    def render_preview(self, filename, edits):
+        """Render edits on the proxy, returns JPEG bytes."""
+        img = apply_edits(self.get_edit_proxy(filename), edits)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=85)
+        return buf.getvalue()
 
-        if not os.path.exists(image_path):
-            return False, "Original image not found."
+    def save_edit(self, filename, edits, save_option, new_filename=None):
+        """Queue edits of one image to be saved based on user selection, returns (success, message, job)."""
+        return self.save_edits([filename], edits, save_option, new_filename)
 
+    def save_edits(self, filenames, edits, save_option, new_filename=None):
+        """
+        Apply the same edits to several images. "replace" stores them in each image's sidecar
+        and keeps the original, "new_file" queues a full resolution export to new_filename for
+        a single image or to edited_<filename> otherwise. Returns (success, message, job).
+        """
+        print(f"Applying edits to {', '.join(filenames)}: {edits}")
+        missing = [filename for filename in filenames
+                   if os.path.basename(filename) != filename or not os.path.exists(os.path.join(self.upload_folder, filename))]
+        if missing:
+            return False, f"Original image not found: {', '.join(missing)}", None
         try:
-            with Image.open(image_path) as img:
-                img = img.convert("RGB")  # Ensure no transparency issues
-
-                # Reset EXIF rotation before applying new rotation
-                img = ImageOps.exif_transpose(img)
-
-                # Convert brightness and contrast from 0-200 range to 0.1-2.0
-                if "brightness" in edits:
-                    brightness_factor = max(0.1, float(edits["brightness"]) / 100)
-                    enhancer = ImageEnhance.Brightness(img)
-                    img = enhancer.enhance(brightness_factor)
-
-                if "contrast" in edits:
-                    contrast_factor = max(0.1, float(edits["contrast"]) / 100)
-                    enhancer = ImageEnhance.Contrast(img)
-                    img = enhancer.enhance(contrast_factor)
-
-                # Apply absolute rotation (mod 360 to prevent stacking errors)
-                if "rotation" in edits:
-                    rotation_angle = int(edits["rotation"]) % 360
-                    # Automatically convert the rotation to negative
-                    rotation_angle = -rotation_angle
-                    img = img.rotate(rotation_angle, expand=True)
-                    print(f"Applied rotation: {rotation_angle}°")
-
-                # Determine save path
-                if save_option == "replace":
-                    save_path = image_path
-                elif save_option == "new_file" and new_filename:
-                    save_path = os.path.join(self.upload_folder, new_filename)
-                else:
-                    return False, "Invalid save option."
-
-                img.save(save_path)
-                return True, "Image saved successfully."
+            edits = {key: float(edits[key]) for key in ("brightness", "contrast", "rotation") if key in edits}
+        except (TypeError, ValueError):
+            return False, "Invalid edits.", None
+
+        # Non-destructive, renders are generated when the image is next viewed
+        if save_option == "replace":
+            for filename in filenames:
+                self.write_edits(filename, edits)
+            return True, f"Edits saved for {len(filenames)} image(s)", None
+
+        # Determine save paths
+        if save_option == "new_file" and new_filename and len(filenames) == 1:
+            items = [(filenames[0], os.path.basename(new_filename))]
+        elif save_option == "new_file" and len(filenames) > 1:
+            items = [(filename, f"edited_{filename}") for filename in filenames]
+        else:
+            return False, "Invalid save option.", None
 
-        except Exception as e:
-            logging.error(f"Error applying edits to image {filename}: {e}")
-            return False, "Failed to edit image."
+        job = self.exports.submit(items, edits)
+        return True, job["message"], job
 
 
 ####################
 # Cycle through Cameras to create connected camera config
 ####################
 
-# Template for a new config which will be the new camera-last-config
-currently_connected_cameras = {'cameras': []}
-# Iterate over each camera in the global_cameras list building a config model
-for connected_camera in global_cameras:   
-    # Check if the connected camera is a Raspberry Pi Camera Module
-    matching_module = next(
-        (module for module in camera_module_info["camera_modules"] 
-         if module["sensor_model"] == connected_camera["Model"]), 
-        None
-    )
-    if matching_module and matching_module.get("is_pi_cam", False) is True:
-        print(f"Connected camera model '{connected_camera['Model']}' is found in the camera-module-info.json and is a Pi Camera.\n")
-        is_pi_cam = True
-    else:
-        print(f"Connected camera model '{connected_camera['Model']}' is either NOT in the camera-module-info.json or is NOT a Pi Camera.\n")
-        is_pi_cam = False
-    # Build usable Connected Camera Information variable
-    camera_info = {'Num':connected_camera['Num'], 'Model':connected_camera['Model'], 'Is_Pi_Cam': is_pi_cam, 'Has_Config': False, 'Config_Location': f"default_{connected_camera['Model']}.json"}
-    currently_connected_cameras['cameras'].append(camera_info)
-
-# Create a lookup for existing cameras by "Num"
-existing_cameras_lookup = {cam["Num"]: cam for cam in camera_last_config["cameras"]}
-# Prepare the updated list of cameras
-updated_cameras = []
-
-# Compare config generated from global_cameras with what was last connected and update the camera-last-config
-for new_cam in currently_connected_cameras["cameras"]:
-    cam_num = new_cam["Num"]
-    if cam_num in existing_cameras_lookup:
-        old_cam = existing_cameras_lookup[cam_num]  
-        # If the camera model has changed, update it
-        if old_cam["Model"] != new_cam["Model"]:
-            print(f"Updating camera {new_cam['Model']}: Model or Pi Cam status changed.")
-            updated_cameras.append(new_cam)
+def sync_connected_cameras(global_cameras, camera_last_config):
+    """Merge the cameras picamera2 found with camera-last-config, saves and returns the list of connected cameras."""
+    # Template for a new config which will be the new camera-last-config
+    currently_connected_cameras = {'cameras': []}
+    # Iterate over each camera in the global_cameras list building a config model
+    for connected_camera in global_cameras:   
+        # Check if the connected camera is a Raspberry Pi Camera Module
+        matching_module = camera_modules_by_model.get(connected_camera["Model"])
+        if matching_module and matching_module.get("is_pi_cam", False) is True:
+            print(f"Connected camera model '{connected_camera['Model']}' is found in the camera-module-info.json and is a Pi Camera.\n")
+            is_pi_cam = True
         else:
-            # Keep existing config if nothing changed
-            updated_cameras.append(old_cam)
-    else:
-        # If it's a new camera, add it to the list
-        print(f"New camera added to config: {new_cam}")
-        updated_cameras.append(new_cam)
-
-# Save the updated configuration
-new_config = {"cameras": updated_cameras}
-with open(os.path.join(current_dir, 'camera-last-config.json'), "w") as file:
-    json.dump(new_config, file, indent=4)
-
-# Make sure currently_connected_cameras is the definitively list of connected cameras
-currently_connected_cameras = updated_cameras
-
-print(f"\n\n{currently_connected_cameras}\n\n ")
+            print(f"Connected camera model '{connected_camera['Model']}' is either NOT in the camera-module-info.json or is NOT a Pi Camera.\n")
+            is_pi_cam = False
+        # Build usable Connected Camera Information variable
+        camera_info = {'Num':connected_camera['Num'], 'Model':connected_camera['Model'], 'Is_Pi_Cam': is_pi_cam, 'Has_Config': False, 'Config_Location': f"default_{connected_camera['Model']}.json"}
+        currently_connected_cameras['cameras'].append(camera_info)
+
+    # Create a lookup for existing cameras by "Num"
+    existing_cameras_lookup = {cam["Num"]: cam for cam in camera_last_config["cameras"]}
+    # Prepare the updated list of cameras
+    updated_cameras = []
+
+    # Compare config generated from global_cameras with what was last connected and update the camera-last-config
+    for new_cam in currently_connected_cameras["cameras"]:
+        cam_num = new_cam["Num"]
+        if cam_num in existing_cameras_lookup:
+            old_cam = existing_cameras_lookup[cam_num]  
+            # If the camera model has changed, update it
+            if old_cam["Model"] != new_cam["Model"]:
+                print(f"Updating camera {new_cam['Model']}: Model or Pi Cam status changed.")
+                updated_cameras.append(new_cam)
+            else:
+                # Keep existing config if nothing changed
+                updated_cameras.append(old_cam)
+        else:
+            # If it's a new camera, add it to the list
+            print(f"New camera added to config: {new_cam}")
+            updated_cameras.append(new_cam)
 
+    # Save the updated configuration
+    new_config = {"cameras": updated_cameras}
+    profile_store.write_last_config(new_config)
+    return updated_cameras
 
 
 ####################
@@ -1110,14 +2584,39 @@ print(f"\n\n{currently_connected_cameras}\n\n ")
 ####################
 
 cameras = {}
+# State of every connected camera while the web server is already up: "warming_up", "ready" or "error"
+camera_states = {}
+# libcamera is not safe to open cameras from several threads at once
+picamera2_open_lock = threading.Lock()
+# Guards inserts into cameras and camera_states while the init threads run, readers iterate list_cameras()
+cameras_lock = threading.Lock()
+
+def list_cameras():
+    """Snapshot of (camera_num, CameraObject) pairs, safe to iterate while cameras are still being added."""
+    with cameras_lock:
+        return list(cameras.items())
+
+def init_camera(connected_camera):
+    camera_num = connected_camera['Num']
+    try:
+        camera_obj = CameraObject(connected_camera)
+        with cameras_lock:
+            cameras[camera_num] = camera_obj
+            camera_states[camera_num] = "ready"
+        print(f"Key: {camera_num}, Camera: {camera_obj.camera_info}")
+    except Exception as e:
+        with cameras_lock:
+            camera_states[camera_num] = "error"
+        print(f"Error initializing camera {camera_num}: {e}")
 
-for connected_camera in currently_connected_cameras:
-    camera_obj = CameraObject(connected_camera)
-    cameras[connected_camera['Num']] = camera_obj
-    print(f"\n\n{cameras}\n\n ")
+def start_cameras(connected_cameras):
+    # Initialize the cameras concurrently so one slow camera doesn't hold up the others or the web server
+    for connected_camera in connected_cameras:
+        camera_states[connected_camera['Num']] = "warming_up"
+        threading.Thread(target=init_camera, args=(connected_camera,), daemon=True).start()
 
-for key, camera in cameras.items():
-    print(f"Key: {key}, Camera: {camera.camera_info}")
+def camera_warming_up(camera_num):
+    return camera_states.get(camera_num) == "warming_up"
 
 
 ####################
@@ -1129,11 +2628,23 @@ def inject_theme():
     theme = session.get('theme', 'light')  # Default to 'light'
     return dict(version=version, title=project_title, theme=theme)
 
+# Navbar camera list, rebuilt only when the set of cameras changes
+navbar_camera_list = []
+navbar_camera_keys = None
+
+def get_navbar_camera_list():
+    global navbar_camera_list, navbar_camera_keys
+    current_cameras = dict(list_cameras())
+    keys = tuple(sorted(current_cameras))
+    if keys != navbar_camera_keys:
+        navbar_camera_list = [(current_cameras[key].camera_info, get_camera_info(current_cameras[key].camera_info['Model'])) 
+                              for key in keys]
+        navbar_camera_keys = keys
+    return navbar_camera_list
+
 @app.context_processor
 def inject_camera_list():
-    camera_list = [(camera.camera_info, get_camera_info(camera.camera_info['Model'], camera_module_info)) 
-                   for key, camera in cameras.items()]
-    return dict(camera_list=camera_list, navbar=True)
+    return dict(camera_list=get_navbar_camera_list(), navbar=True)
 
 @app.route('/set_theme/<theme>')
 def set_theme(theme):
@@ -1143,8 +2654,23 @@ def set_theme(theme):
 # Define 'home' route
 @app.route('/')
 def home():
-    camera_list = [(camera.camera_info, get_camera_info(camera.camera_info['Model'], camera_module_info)) for key, camera in cameras.items()]
-    return render_template('home.html', active_page='home')
+    warming_cameras = [camera_info for camera_info in currently_connected_cameras if camera_warming_up(camera_info['Num'])]
+    return render_template('home.html', active_page='home', warming_cameras=warming_cameras)
+
+@app.route('/camera_status')
+def camera_status():
+    status = {}
+    with cameras_lock:
+        states = list(camera_states.items())
+    for camera_num, state in states:
+        camera = cameras.get(camera_num)
+        status[str(camera_num)] = {
+            "state": state,
+            "streaming": camera.streaming if camera else False,
+            "stream_start_latency": camera.last_stream_start_latency if camera else None,
+            "reconfigure_latency": camera.last_reconfigure_latency if camera else None
+        }
+    return jsonify(status)
 
 @app.route('/camera_info_<int:camera_num>')
 def camera_info(camera_num):
@@ -1296,18 +2822,17 @@ def restart():
 @app.route("/camera_mobile_<int:camera_num>")
 def camera_mobile(camera_num):
     try:
+        if camera_warming_up(camera_num):
+            return render_template('error.html', error=f"Camera {camera_num} is warming up, try again in a few seconds."), 503
         camera = cameras.get(camera_num)
         if not camera:
             return render_template('camera_not_found.html', camera_num=camera_num)
         # Get camera settings
         live_controls = camera.live_controls
-        print(live_controls)
         sensor_modes = camera.sensor_modes
-        active_mode_index = camera.get_sensor_mode()
-        # Find the last image taken by this specific camera
-        last_image = None
-        last_image = image_gallery_manager.find_last_image_taken()
-        return render_template('camera_mobile.html', camera=camera.camera_info, settings=live_controls, sensor_modes=sensor_modes, active_mode_index=active_mode_index, last_image=last_image, profiles=list_profiles(),navbar=False, theme='dark', mode="mobile") 
+        # Active mode, last image taken and profiles come from the cached page context
+        page_context = camera.get_page_context()
+        return render_template('camera_mobile.html', camera=camera.camera_info, settings=live_controls, sensor_modes=sensor_modes, active_mode_index=page_context["active_mode_index"], last_image=page_context["last_image"], profiles=page_context["profiles"],navbar=False, theme='dark', mode="mobile") 
     except Exception as e:
         logging.error(f"Error loading camera view: {e}")
         return render_template('error.html', error=str(e))
@@ -1315,17 +2840,17 @@ def camera_mobile(camera_num):
 @app.route("/camera_<int:camera_num>")
 def camera(camera_num):
     try:
+        if camera_warming_up(camera_num):
+            return render_template('error.html', error=f"Camera {camera_num} is warming up, try again in a few seconds."), 503
         camera = cameras.get(camera_num)
         if not camera:
             return render_template('camera_not_found.html', camera_num=camera_num)
         # Get camera settings
         live_controls = camera.live_controls
         sensor_modes = camera.sensor_modes
-        active_mode_index = camera.get_sensor_mode()
-        # Find the last image taken by this specific camera
-        last_image = None
-        last_image = image_gallery_manager.find_last_image_taken()
-        return render_template('camera.html', camera=camera.camera_info, settings=live_controls, sensor_modes=sensor_modes, active_mode_index=active_mode_index, last_image=last_image, profiles=list_profiles(), mode="desktop")
+        # Active mode, last image taken and profiles come from the cached page context
+        page_context = camera.get_page_context()
+        return render_template('camera.html', camera=camera.camera_info, settings=live_controls, sensor_modes=sensor_modes, active_mode_index=page_context["active_mode_index"], last_image=page_context["last_image"], profiles=page_context["profiles"], mode="desktop")
     except Exception as e:
         logging.error(f"Error loading camera view: {e}")
         return render_template('error.html', error=str(e))
@@ -1340,6 +2865,8 @@ def capture_still(camera_num):
     try:
         logging.debug(f"📸 Received capture request for camera {camera_num}")
 
+        if camera_warming_up(camera_num):
+            return jsonify(success=False, message="Camera is warming up"), 503
         camera = cameras.get(camera_num)
         if not camera:
             logging.warning(f"❌ Camera {camera_num} not found.")
@@ -1359,41 +2886,111 @@ def capture_still(camera_num):
         image_filename = f"pimage_camera_{camera_num}_{timestamp}"
         logging.debug(f"📁 New image filename: {image_filename}")
 
-        # Capture and save the new image
-        image_path = camera.take_still(camera_num, image_filename)
-
-        # Add a slight delay to prevent overlapping captures
-        time.sleep(0.5)
-
-        if image_path:
-            logging.info(f"✅ Image captured successfully: {image_filename}")
-            return jsonify(success=True, message="Image captured successfully", image=image_filename)
-        else:
-            logging.error(f"❌ Failed to capture image for camera {camera_num}")
-            return jsonify(success=False, message="Failed to capture image")
+        # Queue the capture and return straight away, clients follow the job via /capture_status/<job_id>
+        job = camera.capture_queue.submit(image_filename, on_image=add_capture_to_gallery)
+        logging.info(f"📥 Capture queued for camera {camera_num}: job {job['id']}")
+        return jsonify(success=True, message="Capture queued", image=image_filename, job_id=job["id"], status_url=url_for('capture_status', job_id=job["id"]))
 
+    except CameraBusyError:
+        raise
     except Exception as e:
         logging.error(f"🔥 Error capturing still image: {e}")
         return jsonify(success=False, message=str(e)), 500
+
+def add_capture_to_gallery(image_path):
+    image_gallery_manager.add_image(os.path.basename(image_path))
+
+@app.route("/capture_burst_<int:camera_num>", methods=["POST"])
+def capture_burst(camera_num):
+    camera = cameras.get(camera_num)
+    if not camera:
+        return jsonify(success=False, message="Camera not found"), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get("count", 5))
+    except (TypeError, ValueError):
+        return jsonify(success=False, message="Invalid burst count"), 400
+    if count < 1 or count > max_burst_count:
+        return jsonify(success=False, message=f"Burst count must be between 1 and {max_burst_count}"), 400
+    job = camera.capture_queue.submit(f"pimage_camera_{camera_num}", on_image=add_capture_to_gallery, mode="burst", options={"count": count})
+    return jsonify(success=True, message="Burst queued", job_id=job["id"], status_url=url_for('capture_status', job_id=job["id"]))
+
+@app.route("/capture_timelapse_<int:camera_num>", methods=["POST"])
+def capture_timelapse(camera_num):
+    camera = cameras.get(camera_num)
+    if not camera:
+        return jsonify(success=False, message="Camera not found"), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        interval = float(data.get("interval", 0))
+        count = int(data["count"]) if data.get("count") else None
+        # End time may be given as a unix timestamp or as a duration in seconds from now
+        end_time = float(data["end_time"]) if data.get("end_time") else None
+        if data.get("duration"):
+            end_time = time.time() + float(data["duration"])
+    except (TypeError, ValueError):
+        return jsonify(success=False, message="Invalid time-lapse settings"), 400
+    if interval <= 0:
+        return jsonify(success=False, message="Interval must be greater than 0"), 400
+    if count is None and end_time is None:
+        return jsonify(success=False, message="A count, duration or end_time is required"), 400
+    options = {"interval": interval, "count": count, "end_time": end_time}
+    job = camera.capture_queue.submit(f"pimage_camera_{camera_num}", on_image=add_capture_to_gallery, mode="timelapse", options=options)
+    return jsonify(success=True, message="Time-lapse queued", job_id=job["id"], status_url=url_for('capture_status', job_id=job["id"]))
+
+@app.route("/cancel_capture/<job_id>", methods=["POST"])
+def cancel_capture(job_id):
+    job = capture_jobs.get(job_id)
+    if not job or job["camera_num"] not in cameras:
+        return jsonify(success=False, message="Capture job not found"), 404
+    if not cameras[job["camera_num"]].capture_queue.cancel(job_id):
+        return jsonify(success=False, message="Capture job already finished"), 409
+    return jsonify(success=True, message="Capture job cancelled")
+
+@app.route("/capture_status/<job_id>")
+def capture_status(job_id):
+    job = capture_jobs.get(job_id)
+    if not job:
+        return jsonify(success=False, message="Capture job not found"), 404
+    return jsonify(success=job["status"] != "failed", **job)
     
 @app.route('/snapshot_<int:camera_num>')
 def snapshot(camera_num):
     camera = cameras.get(camera_num)
     if camera:
         image_name = f"snapshot_{camera_num}"
-        filepath = camera.take_still_from_feed(camera_num, image_name)
+        # Count as a viewer so a suspended camera is started, the capture is queued behind the start
+        camera.acquire_stream()
+        try:
+            filepath = camera.take_still_from_feed(camera_num, image_name)
+        finally:
+            camera.release_stream()
         
         if filepath:
             time.sleep(1)  # Ensure the image is saved
             return send_file(filepath, as_attachment=False, download_name="snapshot.jpg", mimetype='image/jpeg')
+        abort(500)
     else:
         abort(404)
 
+# Set when the app is started with --async-stream
+async_stream_server = None
+
 @app.route('/video_feed_<int:camera_num>')
 def video_feed(camera_num):
+    if camera_warming_up(camera_num):
+        return Response("Camera is warming up", status=503, headers={"Retry-After": "2"})
     camera = cameras.get(camera_num)
+    if camera and async_stream_server:
+        # Hand the viewer over to the asyncio streaming server
+        host = request.host.split(':')[0]
+        query = f"?{request.query_string.decode()}" if request.query_string else ""
+        return redirect(f"{request.scheme}://{host}:{async_stream_server.port}/video_feed_{camera_num}{query}")
     if camera:
-        return Response(camera.generate_stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
+        # Optional per-client frame rate cap and stream quality e.g. /video_feed_0?max_fps=10&quality=low
+        max_fps = request.args.get('max_fps', type=float)
+        quality = request.args.get('quality', 'high')
+        return Response(camera.generate_stream(max_fps=max_fps, quality=quality), mimetype='multipart/x-mixed-replace; boundary=frame')
     else:
         abort(404)
 
@@ -1409,11 +3006,15 @@ def toggle_video_feed():
     camera_num = int(camera_num)
 
     if camera_num in cameras:
-        if enable:
-            cameras[camera_num].start_streaming()
+        # Switching the feed off overrides the automatic start on first viewer / suspend when idle,
+        # switching it back on (or "auto") hands control back. "keep_running" disables the idle suspend
+        if data.get("keep_running"):
+            cameras[camera_num].set_stream_override(True)
+        elif data.get("auto") or enable:
+            cameras[camera_num].set_stream_override(None)
         else:
-            cameras[camera_num].stop_streaming()
-        return jsonify({"success": True})
+            cameras[camera_num].set_stream_override(False)
+        return jsonify({"success": True, "streaming": cameras[camera_num].streaming})
     
     return jsonify({"success": False, "error": "Camera not found"}), 404
 
@@ -1423,8 +3024,12 @@ def preview(camera_num):
         camera = cameras.get(camera_num)
         if camera:
             filepath = f'snapshot/pimage_preview_{camera_num}'
-            preview_path = camera.take_still(camera_num, filepath)
-            return jsonify(success=True, message="Photo captured successfully", image_path=preview_path)
+            # Go through the capture queue so previews never race a queued still
+            job = camera.capture_queue.submit(filepath)
+            job = camera.capture_queue.wait(job["id"])
+            return jsonify(success=True, message="Photo captured successfully", image_path=job["image_path"], capture_method=job["capture_method"])
+    except CameraBusyError:
+        raise
     except Exception as e:
         return jsonify(success=False, message=str(e))
 
@@ -1439,12 +3044,35 @@ def update_setting():
         print(f"Received update for Camera {camera_num}: {setting_id} -> {new_value}")
         camera = cameras.get(camera_num)
         camera.update_settings(setting_id, new_value)
-        # ✅ At this stage, we're just verifying the data. No changes to the camera yet.
         return jsonify({
             "success": True,
-            "message": f"Received setting update for Camera {camera_num}: {setting_id} -> {new_value}"
+            "message": f"Received setting update for Camera {camera_num}: {setting_id} -> {new_value}",
+            "change": camera.last_change_kind  # "controls", "still_config" or "restart"
         })
 
+    except CameraBusyError:
+        raise  # Answered by camera_busy
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/update_settings_batch', methods=['POST'])
+def update_settings_batch():
+    try:
+        data = request.json  # {"camera_num": 0, "settings": {"Brightness": 0.1, "Contrast": 1.2}}
+        camera_num = data.get("camera_num")
+        settings = data.get("settings")
+        camera = cameras.get(camera_num)
+        if not camera:
+            return jsonify({"success": False, "error": "Camera not found"}), 404
+        if not isinstance(settings, dict) or not settings:
+            return jsonify({"success": False, "error": "No settings provided"}), 400
+        applied = camera.update_settings_batch(settings)
+        return jsonify({"success": True, "applied": applied})
+
+    except CameraBusyError:
+        raise  # Answered by camera_busy
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1518,9 +3146,35 @@ def fetch_metadata(camera_num):
         return jsonify({"error": "Invalid camera number"}), 400
     camera = cameras[camera_num]
     metadata = camera.capture_metadata()  # Get metadata for the selected camera
-    print(f"Camera {camera_num} Metadata: {metadata}")  # Log metadata
     return jsonify(metadata)  # Return as JSON
 
+@app.route("/metadata_history_<int:camera_num>")
+def metadata_history(camera_num):
+    # ?seconds=600 or ?start=&end= (unix time), optional ?fields=ExposureTime,Lux and ?points=500
+    if camera_num not in cameras:
+        return jsonify({"error": "Invalid camera number"}), 400
+    camera = cameras[camera_num]
+    try:
+        end = float(request.args.get("end", time.time()))
+        start = float(request.args.get("start", end - float(request.args.get("seconds", 600))))
+        max_points = min(int(request.args.get("points", 500)), 5000)
+    except ValueError:
+        return jsonify({"error": "Invalid start, end, seconds or points"}), 400
+    fields = request.args.get("fields")
+    fields = fields.split(",") if fields else None
+    history = camera.metadata_history.query(start, end, fields, max_points)
+    # Without metadata_history_keep_running no samples are taken while the camera is suspended
+    suspended = history.pop("suspended")
+    return jsonify({"camera_num": camera_num, "start": start, "end": end, "series": history, "suspended": suspended})
+
+@app.route("/metadata_stream_<int:camera_num>")
+def metadata_stream(camera_num):
+    if camera_num not in cameras:
+        return jsonify({"error": "Invalid camera number"}), 400
+    camera = cameras[camera_num]
+    return Response(camera.generate_metadata_events(), mimetype="text/event-stream",
+                    headers={"X-Accel-Buffering": "no"})  # Don't let a reverse proxy hold events back
+
 @app.route("/load_profile", methods=["POST"])
 def load_profile():
     data = request.get_json()
@@ -1549,9 +3203,6 @@ def get_profiles():
 # GPIO routes 
 ####################
 
-# Initialize the gallery with the upload folder
-gpio = GPIO()
-
 @app.route("/gpio_setup")
 def gpio_setup():
     gpio_pins = gpio.get_gpio_pins()
@@ -1562,14 +3213,11 @@ def gpio_setup():
 # Image gallery routes 
 ####################
 
-# Initialize the gallery with the upload folder
-image_gallery_manager = ImageGallery(upload_folder)
-
 @app.route('/image_gallery')
 def image_gallery():
     page = request.args.get('page', 1, type=int)
     images, total_pages = image_gallery_manager.paginate_images(page)
-    cameras_data = [(camera_num, camera) for camera_num, camera in cameras.items()]
+    cameras_data = list_cameras()
     if not images:
         return render_template('no_files.html')
     # Define pagination bounds
@@ -1590,7 +3238,7 @@ def image_gallery():
 def get_image_for_page():
     page = request.args.get('page', 1, type=int)
     images, total_pages = image_gallery_manager.paginate_images(page)
-    cameras_data = [(camera_num, camera) for camera_num, camera in cameras.items()]
+    cameras_data = list_cameras()
     if not images:
         return render_template('no_files.html')
     # Define pagination bounds
@@ -1606,6 +3254,34 @@ def get_image_for_page():
     }
     return jsonify(response)
     
+@app.route('/thumb/<filename>')
+def thumb(filename):
+    size = request.args.get('size', thumbnail_sizes[0], type=int)
+    if size not in thumbnail_sizes or os.path.basename(filename) != filename:
+        abort(404)
+    try:
+        thumb_path = image_gallery_manager.get_render(filename, size)
+    except FileNotFoundError:
+        abort(404)
+    response = send_file(thumb_path, mimetype='image/jpeg')
+    # Thumbnail URLs carry the image mtime, so they can be cached for a long time
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+@app.route('/image/<filename>')
+def gallery_image(filename):
+    # The image with its sidecar edits applied, ?original=1 for the untouched file
+    if os.path.basename(filename) != filename:
+        abort(404)
+    try:
+        if request.args.get('original'):
+            image_path = os.path.join(app.config['upload_folder'], filename)
+        else:
+            image_path = image_gallery_manager.get_render(filename)
+        return send_file(image_path, mimetype='image/jpeg', as_attachment='download' in request.args, download_name=filename)
+    except FileNotFoundError:
+        abort(404)
+
 @app.route('/view_image/<filename>')
 def view_image(filename):
     return render_template('view_image.html', filename=filename)
@@ -1621,34 +3297,30 @@ def delete_image(filename):
 
 @app.route('/image_edit/<filename>')
 def edit_image(filename):
-    return render_template('image_edit.html', filename=filename)
+    # Start from the edits already saved in the sidecar
+    edits = image_gallery_manager.load_edits(filename)
+    return render_template('image_edit.html', filename=filename, edits=edits)
 
-@app.route("/apply_filters", methods=["POST"])
+@app.route("/apply_filters", methods=["GET", "POST"])
 def apply_filters():
-    filename = request.form["filename"]
-    brightness = float(request.form["brightness"])
-    contrast = float(request.form["contrast"])
-    rotation = float(request.form["rotation"])
-
-    img_path = os.path.join(app.config['upload_folder'], filename)
-    img = Image.open(img_path)
-
-    # Apply transformations
-    img = img.rotate(-rotation, expand=True)
-    enhancer = ImageEnhance.Brightness(img)
-    img = enhancer.enhance(brightness)
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(contrast)
-
-    edited_filename = f"edited_{filename}"
-    edited_path = os.path.join(app.config['upload_folder'], edited_filename)
-    img.save(edited_path)
-
-    return send_from_directory(app.config['upload_folder'], edited_filename)
+    # Editor preview, renders the edits on a downscaled proxy, /save_edit renders full resolution
+    filename = request.values.get("filename", "")
+    if os.path.basename(filename) != filename or not filename:
+        abort(404)
+    edits = {key: request.values[key] for key in ("brightness", "contrast", "rotation") if key in request.values}
+    try:
+        preview = image_gallery_manager.render_preview(filename, edits)
+    except FileNotFoundError:
+        abort(404)
+    except ValueError:
+        abort(400)
+    return send_file(io.BytesIO(preview), mimetype='image/jpeg')
 
 @app.route('/download_image/<filename>', methods=['GET'])
 def download_image(filename):
     try:
+        if filename.endswith('.jpg') and not request.args.get('original'):
+            return redirect(url_for('gallery_image', filename=filename, download=1))  # Include sidecar edits
         image_path = os.path.join(app.config['upload_folder'], filename)
         return send_file(image_path, as_attachment=True)
     except Exception as e:
@@ -1664,14 +3336,50 @@ def save_edit():
         save_option = data.get('saveOption')
         new_filename = data.get('newFilename')
 
-        success, message = image_gallery_manager.save_edit(filename, edits, save_option, new_filename)
-
-        return jsonify({'success': success, 'message': message})
+        success, message, job = image_gallery_manager.save_edit(filename, edits, save_option, new_filename)
+        if not success:
+            return jsonify({'success': False, 'message': message})
+        if not job:
+            return jsonify({'success': True, 'message': message})  # Stored in the sidecar, nothing to render now
+        # The edit is rendered in the background, clients follow it via /export_status/<job_id>
+        return jsonify({'success': True, 'message': message, 'job_id': job["id"], 'status_url': url_for('export_status', job_id=job["id"])})
 
     except Exception as e:
         logging.error(f"Error in save_edit route: {e}")
         return jsonify({'success': False, 'message': 'Error saving edit'}), 500
 
+@app.route('/export_edits', methods=['POST'])
+def export_edits():
+    # {"filenames": [...], "edits": {"brightness": 120}, "saveOption": "new_file"}
+    data = request.get_json(silent=True) or {}
+    filenames = data.get('filenames')
+    if not isinstance(filenames, list) or not filenames:
+        return jsonify({'success': False, 'message': 'No images selected'}), 400
+    if len(filenames) > max_export_batch:
+        return jsonify({'success': False, 'message': f'At most {max_export_batch} images per export'}), 400
+    success, message, job = image_gallery_manager.save_edits(filenames, data.get('edits', {}), data.get('saveOption', 'new_file'))
+    if not success:
+        return jsonify({'success': False, 'message': message}), 400
+    if not job:
+        return jsonify({'success': True, 'message': message})
+    return jsonify({'success': True, 'message': message, 'job_id': job["id"], 'status_url': url_for('export_status', job_id=job["id"])})
+
+@app.route('/export_status/<job_id>')
+def export_status(job_id):
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify(success=False, message="Export job not found"), 404
+    with export_jobs_lock:
+        return jsonify(success=job["status"] not in ("failed", "cancelled"), **job)
+
+@app.route('/cancel_export/<job_id>', methods=['POST'])
+def cancel_export(job_id):
+    if job_id not in export_jobs:
+        return jsonify(success=False, message="Export job not found"), 404
+    if not image_gallery_manager.exports.cancel(job_id):
+        return jsonify(success=False, message="Export job already running or finished"), 409
+    return jsonify(success=True, message="Pending images cancelled")
+
 
 ####################
 # Misc Routes
@@ -1681,13 +3389,56 @@ def save_edit():
 def beta():
     return render_template('beta.html')
 
+@app.errorhandler(CameraBusyError)
+def camera_busy(e):
+    # Reconfiguration during a burst or time-lapse, or a camera command that timed out
+    return jsonify({"success": False, "error": str(e)}), 409
+
 @app.after_request
 def add_header(response):
+    if request.endpoint == 'thumb':
+        return response  # Thumbnails set their own long-lived cache headers
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return response
 
+####################
+# Startup
+####################
+
+# Kept in one place so the spawned export workers (see export_worker_process) never open cameras, GPIO or the stores
+if not export_worker_process:
+    # Create the profile and gallery folders if they do not exist
+    os.makedirs(app.config['camera_profile_folder'], exist_ok=True)
+    os.makedirs(app.config['upload_folder'], exist_ok=True)
+
+    # Set debug level to Warning
+    Picamera2.set_logging(Picamera2.DEBUG)
+    # Ask picamera2 for what cameras are connected
+    global_cameras = Picamera2.global_camera_info()
+
+    ##### Uncomment the line below if you want to limt the number of cameras connected (change the number to index which camera you want)
+    # global_cameras = [global_cameras[0]]
+
+    ##### Uncomment the line below simulate having no cameras connected
+    # global_cameras = []
+
+    print(f'\nInitialize picamera2 - Cameras Found:\n{global_cameras}\n')
+
+    profile_store = ProfileStore(camera_profile_folder, last_config_file_path)
+    # Load or initialize the configuration
+    camera_last_config = load_or_initialize_config(last_config_file_path, minimum_last_config)
+
+    # Make sure currently_connected_cameras is the definitively list of connected cameras
+    currently_connected_cameras = sync_connected_cameras(global_cameras, camera_last_config)
+    print(f"\n\n{currently_connected_cameras}\n\n ")
+    start_cameras(currently_connected_cameras)
+
+    gpio = GPIO()
+    # Initialize the gallery with the upload folder
+    image_gallery_manager = ImageGallery(upload_folder, index_path=os.path.join(current_dir, 'gallery-index.json'))
+
 ####################
 # Start Flask 
 ####################
@@ -1697,6 +3448,11 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='PiCamera2 WebUI')
     parser.add_argument('--port', type=int, default=8080, help='Port number to run the web server on')
     parser.add_argument('--ip', type=str, default='0.0.0.0', help='IP to which the web server is bound to')
+    parser.add_argument('--async-stream', action='store_true', help='Serve the video feeds from an asyncio server instead of Flask threads')
+    parser.add_argument('--stream-port', type=int, default=8081, help='Port number for the async video feed server')
     args = parser.parse_args()
+    if args.async_stream:
+        async_stream_server = AsyncStreamServer(cameras, host=args.ip, port=args.stream_port)
+        async_stream_server.start()
     # If there are no arguments the port will be 8080 and ip 0.0.0.0 
     app.run(host=args.ip, port=args.port)
\ No newline at end of file
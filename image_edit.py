@@ -0,0 +1,51 @@
+# Image edit functions shared by the web app and the export worker processes.
+# Kept out of app.py so jobs sent to a worker reference this module instead of __main__.
+import os
+
+from PIL import Image, ImageOps
+
+def edit_lut(img, brightness, contrast):
+    """
+    Brightness then contrast as one 768 entry lookup table, matching ImageEnhance.Brightness
+    followed by ImageEnhance.Contrast. The grey level contrast pivots around is taken from a
+    histogram of img instead of an extra full frame pass.
+    """
+    brightened = [min(255, int(value * brightness + 0.5)) for value in range(256)]
+    histogram = img.histogram()
+    channel_means = []
+    for channel in range(3):
+        counts = histogram[channel * 256:(channel + 1) * 256]
+        channel_means.append(sum(count * brightened[value] for value, count in enumerate(counts)) / max(1, sum(counts)))
+    # Same luma weights as convert("L")
+    mean = int(channel_means[0] * 0.299 + channel_means[1] * 0.587 + channel_means[2] * 0.114 + 0.5)
+    lut = [max(0, min(255, int(mean + (value - mean) * contrast + 0.5))) for value in brightened]
+    return lut * 3
+
+def apply_edits(img, edits):
+    """Apply editor edits (brightness and contrast 0-200, rotation in degrees) to an RGB image."""
+    # Convert brightness and contrast from 0-200 range to 0.1-2.0
+    brightness = max(0.1, float(edits.get("brightness", 100)) / 100)
+    contrast = max(0.1, float(edits.get("contrast", 100)) / 100)
+    if brightness != 1 or contrast != 1:
+        img = img.point(edit_lut(img, brightness, contrast))
+    # Apply absolute rotation (mod 360 to prevent stacking errors), clockwise like the editor
+    rotation_angle = int(float(edits.get("rotation", 0))) % 360
+    if rotation_angle in (90, 180, 270):
+        # Lossless pixel shuffle instead of resampling
+        img = img.transpose({90: Image.Transpose.ROTATE_270, 180: Image.Transpose.ROTATE_180, 270: Image.Transpose.ROTATE_90}[rotation_angle])
+    elif rotation_angle:
+        img = img.rotate(-rotation_angle, expand=True)
+    return img
+
+def export_edit(image_path, edits, save_path):
+    """Render edits at full resolution and save them, runs in an ExportQueue worker process."""
+    with Image.open(image_path) as img:
+        # Reset EXIF rotation before applying new rotation
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGB")  # Ensure no transparency issues
+        img = apply_edits(img, edits)
+        # Write next to the target and swap it in, the gallery never sees a half written file
+        tmp_path = f"{save_path}.tmp"
+        img.save(tmp_path, format="JPEG")
+    os.replace(tmp_path, save_path)
+    return save_path